@@ -0,0 +1,79 @@
+import os
+import hashlib
+import threading
+import numpy as np
+import librosa
+
+# Decoded audio is kept here as .npy files, least recently used evicted first
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".chameleon", "decoded")
+CACHE_LIMIT = 2 * 1024 ** 3  # bytes
+
+def cache_key(file_path, sr):
+    """
+    Key a decode by path, size, modification time and target sample rate
+    """
+    stat = os.stat(file_path)
+    identity = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{sr or 'native'}"
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+def load(file_path, sr, cache_dir=None, limit=None):
+    """
+    Load a file as float32 (frames,) or (frames, channels), decoding it only once
+
+    Cached decodes come back as read-only memory maps, so repeated loads
+    cost no copy. ``sr=None`` keeps the file's native sample rate.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    limit = CACHE_LIMIT if limit is None else limit
+    path = os.path.join(cache_dir, cache_key(file_path, sr) + ".npy")
+    if os.path.exists(path):
+        try:
+            data = np.load(path, mmap_mode='r')
+            os.utime(path)  # mark as recently used
+            return data
+        except (OSError, ValueError):
+            # Unreadable entry (e.g. a crash mid-write); decode again
+            pass
+
+    audio_data, _ = librosa.load(file_path, sr=sr, mono=False)
+    audio_data = np.ascontiguousarray(audio_data.T, dtype=np.float32)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write under a private name and move into place so readers never see half a file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, audio_data)
+        os.replace(temp_path, path)
+        evict(cache_dir, limit)
+        return np.load(path, mmap_mode='r')
+    except OSError:
+        # A full or read-only disk only costs us the cache
+        return audio_data
+
+def evict(cache_dir=None, limit=None):
+    """Delete least recently used entries until the cache fits in ``limit`` bytes"""
+    cache_dir = cache_dir or CACHE_DIR
+    limit = CACHE_LIMIT if limit is None else limit
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npy"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            total -= size
+        except OSError:
+            pass
+
+def clear(cache_dir=None):
+    """Remove every cached decode"""
+    evict(cache_dir, 0)
@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import scipy.signal as signal
+
+import RealTime
+import AudioCache
+import Manifest
+
+# Integrated loudness as in ITU-R BS.1770 / EBU R128
+BLOCK_SECONDS = 0.4  # gating block length
+STEP_SECONDS = 0.1   # gating blocks overlap by 75 %
+ABSOLUTE_GATE = -70.0  # LUFS
+RELATIVE_GATE = -10.0  # LU below the absolute-gated loudness
+CHANNEL_WEIGHTS = [1.0, 1.0, 1.0, 1.41, 1.41]  # L, R, C, Ls, Rs
+
+# Measurements are remembered per input file and render settings
+MEASUREMENT_FILE = os.path.join(os.path.expanduser("~"), ".chameleon", "loudness.json")
+_cache_lock = threading.Lock()
+
+def k_weighting(rate=RealTime.RATE):
+    """
+    K-weighting filter as second-order sections: the head-related high
+    shelf followed by the RLB high-pass, designed for any sample rate
+    """
+    # High shelf
+    gain_db, q, freq = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    K = np.tan(np.pi * freq / rate)
+    Vh = 10 ** (gain_db / 20)
+    Vb = Vh ** 0.4996667741545416
+    a0 = 1 + K / q + K * K
+    shelf = [(Vh + Vb * K / q + K * K) / a0, 2 * (K * K - Vh) / a0, (Vh - Vb * K / q + K * K) / a0,
+             1.0, 2 * (K * K - 1) / a0, (1 - K / q + K * K) / a0]
+
+    # High-pass
+    q, freq = 0.5003270373238773, 38.13547087602444
+    K = np.tan(np.pi * freq / rate)
+    a0 = 1 + K / q + K * K
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (K * K - 1) / a0, (1 - K / q + K * K) / a0]
+    return np.array([shelf, highpass])
+
+class LoudnessMeter:
+    """
+    Streaming integrated loudness meter
+
+    ``feed`` K-weights each chunk (filter state carries over) and keeps only
+    the energy of every 100 ms step, so a file of any length is measured in
+    one pass with a few floats per second of memory.
+    """
+    def __init__(self, rate=RealTime.RATE):
+        self.rate = rate
+        self.sos = k_weighting(rate)
+        self.step = int(STEP_SECONDS * rate)
+        self.steps_per_block = int(round(BLOCK_SECONDS / STEP_SECONDS))
+        self._zi = None
+        self._leftover = None
+        self._energy = []
+
+    def feed(self, audio_data):
+        """Add a (frames,) or (frames, channels) chunk"""
+        block = RealTime.as_channels(audio_data).astype(np.float64)
+        if self._zi is None:
+            self._zi = np.zeros((len(self.sos), 2, block.shape[1]))
+            self._leftover = np.zeros((0, block.shape[1]))
+        weighted, self._zi = signal.sosfilt(self.sos, block, axis=0, zi=self._zi)
+
+        # Sum the squares over whole steps, carrying the partial step over
+        squares = np.concatenate((self._leftover, weighted ** 2))
+        whole = len(squares) // self.step * self.step
+        if whole:
+            self._energy.append(squares[:whole].reshape(-1, self.step, squares.shape[1]).sum(axis=1))
+        self._leftover = squares[whole:]
+
+    def integrated(self):
+        """Gated integrated loudness in LUFS (-inf when nothing passes the gates)"""
+        if not self._energy:
+            return float('-inf')
+        energy = np.concatenate(self._energy)
+        n = self.steps_per_block
+        if len(energy) < n:
+            return float('-inf')
+
+        # Mean square of every 400 ms block, hopping by one step
+        sums = np.cumsum(np.concatenate((np.zeros((1, energy.shape[1])), energy)), axis=0)
+        mean_square = (sums[n:] - sums[:-n]) / (n * self.step)
+        weights = np.ones(energy.shape[1])
+        count = min(len(weights), len(CHANNEL_WEIGHTS))
+        weights[:count] = CHANNEL_WEIGHTS[:count]
+        power = mean_square @ weights
+        loudness = -0.691 + 10 * np.log10(np.maximum(power, 1e-20))
+
+        # Absolute gate, then the relative gate below what is left
+        gated = loudness > ABSOLUTE_GATE
+        if not np.any(gated):
+            return float('-inf')
+        threshold = -0.691 + 10 * np.log10(power[gated].mean()) + RELATIVE_GATE
+        gated &= loudness > threshold
+        return float(-0.691 + 10 * np.log10(power[gated].mean()))
+
+def measure(chunks, rate=RealTime.RATE):
+    """Integrated loudness of an iterable of chunks"""
+    meter = LoudnessMeter(rate)
+    for chunk in chunks:
+        meter.feed(chunk)
+    return meter.integrated()
+
+def gain_for(loudness, target):
+    """Linear gain that brings ``loudness`` to ``target`` LUFS (1 for silence)"""
+    if not np.isfinite(loudness):
+        return 1.0
+    return float(10 ** ((target - loudness) / 20))
+
+def measurement_key(file_path, settings):
+    """Key a measurement by the input file, the settings and the code it was rendered with"""
+    identity = (AudioCache.cache_key(file_path, RealTime.RATE) + json.dumps(settings, sort_keys=True)
+                + Manifest.code_version())
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+def _read_cache(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def cached(key, path=None):
+    """Previously measured loudness for ``key``, or None"""
+    measurements = _read_cache(path or MEASUREMENT_FILE)
+    if key not in measurements:
+        return None
+    # Silence is stored as null, JSON having no infinity
+    value = measurements[key]
+    return float('-inf') if value is None else value
+
+def store(key, loudness, path=None):
+    """Remember a measurement"""
+    path = path or MEASUREMENT_FILE
+    with _cache_lock:
+        measurements = _read_cache(path)
+        measurements[key] = loudness if np.isfinite(loudness) else None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(measurements, f)
+            os.replace(temp_path, path)
+        except OSError:
+            # Losing the cache only costs a measurement pass next time
+            pass
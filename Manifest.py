@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import numpy as np
+import scipy
+import librosa
+
+# Kept in the output directory of a batch
+MANIFEST_NAME = ".chameleon-manifest.json"
+
+# Modules whose source decides what a render sounds like
+RENDER_MODULES = ("RealTime.py", "PreRec.py", "Loudness.py", "AudioCache.py")
+
+_code_version = None
+
+def code_version():
+    """
+    Hash of the rendering code and the libraries it runs on
+
+    Any edit to the render modules or a library upgrade counts as a new
+    version, so outputs made by older code are rendered again.
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha1()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in RENDER_MODULES:
+            with open(os.path.join(here, name), 'rb') as f:
+                digest.update(f.read())
+        for module in (np, scipy, librosa):
+            digest.update(f"{module.__name__}={module.__version__}".encode("utf-8"))
+        _code_version = digest.hexdigest()
+    return _code_version
+
+def content_hash(file_path, entry=None, block_size=1024 ** 2):
+    """
+    SHA-256 of a file's content
+
+    When the manifest ``entry`` recorded the same file with the same size
+    and modification time, its hash is reused instead of reading it again.
+    """
+    stat = os.stat(file_path)
+    if (entry and entry.get('input') == os.path.abspath(file_path)
+            and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns):
+        return entry['hash']
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load(output_dir):
+    """The manifest of ``output_dir`` as {output file name: entry}"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save(output_dir, manifest):
+    """Replace the manifest in one step so a crash leaves the old or the new one"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+def make_entry(file_path, digest, settings):
+    """What the manifest remembers about one rendered input"""
+    stat = os.stat(file_path)
+    return {
+        'input': os.path.abspath(file_path),
+        'hash': digest,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'settings': settings,
+        'version': code_version(),
+    }
+
+def is_current(entry, digest, settings, output_file):
+    """Whether ``output_file`` was rendered from this content with these settings and code"""
+    return (entry is not None
+            and entry.get('hash') == digest
+            and entry.get('settings') == settings
+            and entry.get('version') == code_version()
+            and os.path.exists(output_file))
@@ -0,0 +1,414 @@
+import socket
+import struct
+import threading
+import time
+import numpy as np
+
+import RealTime
+
+# Default address of the network output
+HOST = "127.0.0.1"
+PORT = 50007
+
+# Packet header: magic, channels, frames, sequence number, send time (seconds)
+MAGIC = b"CHAM"
+HEADER = struct.Struct("!4sHHId")
+MAX_DATAGRAM = 65507
+
+def pack(seq, block, sent=None):
+    """One packet: header plus little-endian float32 samples"""
+    block = RealTime.as_channels(block)
+    payload = np.ascontiguousarray(block, dtype='<f4').tobytes()
+    header = HEADER.pack(MAGIC, block.shape[1], len(block), seq & 0xFFFFFFFF,
+                         time.time() if sent is None else sent)
+    return header + payload
+
+def unpack(packet):
+    """Return (seq, sent time, (frames, channels) block) or None for a foreign packet"""
+    if len(packet) < HEADER.size:
+        return None
+    magic, channels, frames, seq, sent = HEADER.unpack_from(packet)
+    if magic != MAGIC or len(packet) != HEADER.size + 4 * channels * frames:
+        return None
+    block = np.frombuffer(packet, dtype='<f4', offset=HEADER.size).reshape(frames, channels)
+    return seq, sent, block
+
+class AudioSender:
+    """
+    Sends processed blocks to a receiver over UDP or TCP
+
+    ``send`` never blocks or raises, so it can be called from the audio
+    callback. A block that cannot go out at once is dropped and counted.
+    TCP packets are framed with a 4-byte length prefix, and a frame is
+    only dropped before its first byte is written: the rest of a partly
+    written frame is kept and flushed ahead of the next one, so the
+    framing stays intact. A socket error (e.g. the receiver going away)
+    disables the sender; ``error`` tells why.
+    """
+    def __init__(self, host=HOST, port=PORT, protocol="udp"):
+        self.address = (host, port)
+        self.protocol = protocol
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+        self.error = None
+        self._backlog = b""
+        if protocol == "udp":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        elif protocol == "tcp":
+            self.sock = socket.create_connection(self.address, timeout=2.0)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.sock.setblocking(False)
+
+    def send(self, block):
+        """
+        Send one block and return whether it went out; sequence numbers
+        advance even when a block is dropped
+        """
+        packet = pack(self.seq, block)
+        self.seq += 1
+        if self.error is not None:
+            self.dropped += 1
+            return False
+        try:
+            if self.protocol == "udp":
+                if len(packet) > MAX_DATAGRAM:
+                    raise ValueError("Block too large for one UDP datagram")
+                self.sock.sendto(packet, self.address)
+            else:
+                # Finish the frame still in flight before starting a new one
+                if self._backlog and not self._flush():
+                    self.dropped += 1
+                    return False
+                self._backlog = struct.pack("!I", len(packet)) + packet
+                self._flush(new_frame=True)
+            self.sent += 1
+            return True
+        except (BlockingIOError, InterruptedError):
+            self.dropped += 1
+            return False
+        except OSError as e:
+            # The receiver is gone; stop sending instead of failing every callback
+            self.error = e
+            self.dropped += 1
+            return False
+
+    def _flush(self, new_frame=False):
+        """
+        Write as much of the TCP backlog as the socket takes; True once it is empty
+
+        Raises BlockingIOError if not a byte of a ``new_frame`` could be
+        written, so the caller drops that frame whole.
+        """
+        try:
+            written = self.sock.send(self._backlog)
+        except (BlockingIOError, InterruptedError):
+            if new_frame:
+                self._backlog = b""
+                raise
+            written = 0
+        self._backlog = self._backlog[written:]
+        return not self._backlog
+
+    def close(self):
+        self.sock.close()
+
+def tee_callback(callback, sender):
+    """Wrap a sounddevice stream callback so everything played is also sent"""
+    def tee(indata, outdata, frames, time_info, status):
+        callback(indata, outdata, frames, time_info, status)
+        sender.send(outdata)
+    return tee
+
+class JitterBuffer:
+    """
+    Reorders packets and plays them out after an adaptive delay
+
+    The delay target follows the measured inter-arrival jitter (as in RFC
+    3550): ``target_blocks`` = 1 + ``safety`` x jitter in blocks, clamped to
+    ``min_blocks``..``max_blocks``. Late packets are dropped, missing ones
+    are concealed by fading the previous block, and a queue that has grown
+    past the target is cut back so the delay does not creep. At most
+    ``max_blocks`` packets are held.
+
+    A packet numbered behind the playout point but sent after everything
+    seen so far (or far behind it) comes from a restarted sender, whose
+    sequence numbers begin again at 0; the buffer starts over with it.
+    """
+    def __init__(self, blocksize=RealTime.CHUNK, rate=RealTime.RATE, min_blocks=1, max_blocks=8,
+                 safety=3.0):
+        self.block_seconds = blocksize / rate
+        self.min_blocks = min_blocks
+        self.max_blocks = max_blocks
+        self.safety = safety
+        self.lock = threading.Lock()
+        self.packets = {}
+        self.next_seq = None
+        self.playing = False
+        self.jitter = 0.0
+        self.last_block = None
+        self._last_transit = None
+        self._newest_sent = None
+        self.lost = 0
+        self.late = 0
+        self.skipped = 0
+        self.restarts = 0
+
+    def reset(self):
+        """Forget the current stream, e.g. when a new sender connects"""
+        with self.lock:
+            self._reset()
+
+    def _reset(self):
+        self.packets = {}
+        self.next_seq = None
+        self.playing = False
+        self.last_block = None
+        self._last_transit = None
+        self._newest_sent = None
+
+    @property
+    def target_blocks(self):
+        target = 1 + int(np.ceil(self.safety * self.jitter / self.block_seconds))
+        return min(max(target, self.min_blocks), self.max_blocks)
+
+    def put(self, seq, sent, block, arrived=None):
+        """Add a received packet (receiver thread)"""
+        arrived = time.time() if arrived is None else arrived
+        with self.lock:
+            # A sequence number going back in a newer packet means a new stream
+            if self.next_seq is not None and seq < self.next_seq and (
+                    sent > self._newest_sent or self.next_seq - seq > 4 * self.max_blocks):
+                self._reset()
+                self.restarts += 1
+            if self._newest_sent is None or sent > self._newest_sent:
+                self._newest_sent = sent
+
+            # Interarrival jitter from the change in transit time
+            transit = arrived - sent
+            if self._last_transit is not None:
+                self.jitter += (abs(transit - self._last_transit) - self.jitter) / 16
+            self._last_transit = transit
+
+            if self.next_seq is not None and seq < self.next_seq:
+                self.late += 1
+                return
+            self.packets[seq] = (sent, block)
+            if self.next_seq is None:
+                self.next_seq = seq
+
+            # Hold at most max_blocks, dropping the oldest (e.g. nobody is reading)
+            while len(self.packets) > self.max_blocks:
+                self.packets.pop(min(self.packets))
+                self.skipped += 1
+                self.next_seq = min(self.packets)
+
+    def pop(self):
+        """Next block and its send time, or (None, None) while buffering"""
+        with self.lock:
+            if self.next_seq is None:
+                return None, None
+            depth = len(self.packets)
+            target = self.target_blocks
+            if not self.playing:
+                if depth < target:
+                    return None, None
+                self.playing = True
+
+            # Drop the oldest blocks when the queue runs well ahead of the target
+            while depth > target + 2:
+                if self.packets.pop(self.next_seq, None) is not None:
+                    self.skipped += 1
+                    depth -= 1
+                self.next_seq += 1
+
+            packet = self.packets.pop(self.next_seq, None)
+            self.next_seq += 1
+            if packet is not None:
+                self.last_block = packet[1]
+                return packet
+            if not self.packets:
+                # Ran dry: rebuffer up to the target before playing again
+                self.playing = False
+                self.next_seq -= 1
+                return None, None
+
+            # Lost packet: conceal with a faded copy of the previous block
+            self.lost += 1
+            if self.last_block is None:
+                return None, None
+            self.last_block = self.last_block * 0.5
+            return None, self.last_block
+
+class AudioReceiver:
+    """
+    Receives blocks from an AudioSender into a JitterBuffer
+
+    ``read(frames)`` pulls audio at the consumer's pace (e.g. from an output
+    stream callback) and measures the end-to-end latency of every block it
+    plays: from the sender's ``send`` to the moment it is read here.
+    """
+    def __init__(self, host=HOST, port=PORT, protocol="udp", channels=1, **jitter_args):
+        self.protocol = protocol
+        self.channels = channels
+        self.buffer = JitterBuffer(**jitter_args)
+        self.latencies = []
+        self.underruns = 0
+        self._pending = np.zeros((0, channels), dtype=np.float32)
+        self._running = True
+
+        if protocol == "udp":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        elif protocol == "tcp":
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        if protocol == "tcp":
+            self.sock.listen(1)
+        self.port = self.sock.getsockname()[1]
+
+        self._thread = threading.Thread(target=self._run, name="net-receiver", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        if self.protocol == "udp":
+            while self._running:
+                try:
+                    self._deliver(self.sock.recv(MAX_DATAGRAM))
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+        else:
+            while self._running:
+                try:
+                    connection, _ = self.sock.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                with connection:
+                    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    # Every connection is a new stream with its own numbering
+                    self.buffer.reset()
+                    self._read_stream(connection)
+
+    def _read_stream(self, connection):
+        """Split a TCP stream back into length-prefixed packets"""
+        connection.settimeout(0.2)
+        data = b""
+        while self._running:
+            try:
+                received = connection.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not received:
+                return
+            data += received
+            while len(data) >= 4:
+                length = struct.unpack_from("!I", data)[0]
+                if len(data) < 4 + length:
+                    break
+                self._deliver(data[4:4 + length])
+                data = data[4 + length:]
+
+    def _deliver(self, packet):
+        packet = unpack(packet)
+        if packet is not None:
+            seq, sent, block = packet
+            self.buffer.put(seq, sent, RealTime.match_channels(block, self.channels))
+
+    def read(self, frames):
+        """Return the next ``frames`` frames as (frames, channels); silence while buffering"""
+        output = np.zeros((frames, self.channels), dtype=np.float32)
+        filled = 0
+        while filled < frames:
+            if len(self._pending) == 0:
+                sent, block = self.buffer.pop()
+                if block is None:
+                    self.underruns += 1
+                    break
+                if sent is not None:
+                    self.latencies.append(time.time() - sent)
+                self._pending = block
+            count = min(frames - filled, len(self._pending))
+            output[filled:filled + count] = self._pending[:count]
+            self._pending = self._pending[count:]
+            filled += count
+        return output
+
+    def stats(self):
+        """Latency (ms) and loss counters so far"""
+        latencies = np.array(self.latencies[-1000:]) * 1000
+        return {
+            'latency_ms': float(latencies.mean()) if len(latencies) else 0.0,
+            'max_latency_ms': float(latencies.max()) if len(latencies) else 0.0,
+            'jitter_ms': self.buffer.jitter * 1000,
+            'target_blocks': self.buffer.target_blocks,
+            'lost': self.buffer.lost,
+            'late': self.buffer.late,
+            'skipped': self.buffer.skipped,
+            'restarts': self.buffer.restarts,
+            'underruns': self.underruns,
+        }
+
+    def close(self):
+        self._running = False
+        self.sock.close()
+        self._thread.join(timeout=1.0)
+
+def loopback_test(protocol="udp", seconds=3.0, blocksize=256, jitter=0.002):
+    """
+    Send a tone to a local receiver in real time and report the latency
+
+    The sender sleeps a random 0..``jitter`` seconds before each block to
+    imitate an irregular audio clock; no audio hardware is needed.
+    """
+    rate = RealTime.RATE
+    receiver = AudioReceiver(port=0, protocol=protocol, blocksize=blocksize, rate=rate)
+    sender = AudioSender(port=receiver.port, protocol=protocol)
+    period = blocksize / rate
+    rng = np.random.default_rng(0)
+    tone = np.sin(2 * np.pi * 440 * np.arange(int(seconds * rate)) / rate).astype(np.float32)
+
+    def produce():
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(tone) - blocksize + 1, blocksize)):
+            delay = start + i * period + rng.uniform(0, jitter) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sender.send(tone[offset:offset + blocksize])
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    # Consume on our own steady clock, like an output device would
+    start = time.perf_counter()
+    i = 0
+    while producer.is_alive() or receiver.buffer.packets:
+        delay = start + i * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        receiver.read(blocksize)
+        i += 1
+        if i * period > seconds + 1.0:
+            break
+
+    sender.close()
+    receiver.close()
+    return receiver.stats()
+
+if __name__ == "__main__":
+    for protocol in ("udp", "tcp"):
+        stats = loopback_test(protocol)
+        print(f"{protocol}: latency {stats['latency_ms']:.1f} ms (max {stats['max_latency_ms']:.1f}), "
+              f"jitter {stats['jitter_ms']:.2f} ms, target {stats['target_blocks']} blocks, "
+              f"lost {stats['lost']}, late {stats['late']}, skipped {stats['skipped']}, "
+              f"restarts {stats['restarts']}")
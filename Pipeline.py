@@ -0,0 +1,417 @@
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+import RealTime
+
+class RingBuffer:
+    """
+    Lock-free single-producer / single-consumer ring of audio frames
+
+    The producer only ever advances the write counter and the consumer only
+    the read counter, so neither side has to take a lock. Counters grow
+    without wrapping; positions in the ring are taken modulo the capacity.
+    """
+    def __init__(self, capacity, channels, storage=None, counters=None):
+        self.capacity = capacity
+        self.channels = channels
+        self.buffer = storage if storage is not None else np.zeros((capacity, channels), dtype=np.float32)
+        # counters[0] = frames written, counters[1] = frames read
+        self.counters = counters if counters is not None else np.zeros(2, dtype=np.int64)
+
+    def available(self):
+        """Number of frames ready to be read"""
+        return int(self.counters[0] - self.counters[1])
+
+    def space(self):
+        """Number of frames that can be written without overwriting unread data"""
+        return self.capacity - self.available()
+
+    def write(self, data):
+        """
+        Copy as much of ``data`` as fits into the ring and return the frame count
+        """
+        frames = min(len(data), self.space())
+        if frames <= 0:
+            return 0
+        start = int(self.counters[0] % self.capacity)
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        self.buffer[:frames - first] = data[first:frames]
+        # Publish only after the samples are in place
+        self.counters[0] += frames
+        return frames
+
+    def read_into(self, out):
+        """
+        Fill ``out`` with as many frames as are available and return the count
+        """
+        frames = min(len(out), self.available())
+        if frames <= 0:
+            return 0
+        start = int(self.counters[1] % self.capacity)
+        first = min(frames, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:frames] = self.buffer[:frames - first]
+        self.counters[1] += frames
+        return frames
+
+    def skip(self, frames):
+        """Drop up to ``frames`` unread frames (consumer side only)"""
+        frames = min(frames, self.available())
+        if frames > 0:
+            self.counters[1] += frames
+        return max(frames, 0)
+
+    def clear(self):
+        """Drop everything that has not been read yet"""
+        self.counters[1] = self.counters[0]
+
+def prime_output(ring, frames):
+    """Top the output ring up with silence to ``frames`` (producer side only)"""
+    missing = frames - ring.available()
+    if missing > 0:
+        ring.write(np.zeros((missing, ring.channels), dtype=np.float32))
+
+class AudioPipeline:
+    """
+    Runs an effect chain on a dedicated DSP thread between two ring buffers
+
+    The PortAudio callback only copies into the input ring and out of the
+    output ring. The output ring starts with ``margin_blocks`` of silence,
+    which is the extra latency traded for headroom against processing spikes.
+    """
+    def __init__(self, process, blocksize=RealTime.CHUNK, channels_in=1, channels_out=2,
+                 margin_blocks=2, capacity_blocks=16, rate=RealTime.RATE, on_error=None):
+        self.process = process
+        self.blocksize = blocksize
+        self.channels_in = channels_in
+        self.channels_out = channels_out
+        self.margin_blocks = margin_blocks
+        self.rate = rate
+        self.on_error = on_error
+
+        capacity = blocksize * max(capacity_blocks, margin_blocks + 2)
+        self.input_ring = RingBuffer(capacity, channels_in)
+        self.output_ring = RingBuffer(capacity, channels_out)
+        self._in_block = np.zeros((blocksize, channels_in), dtype=np.float32)
+
+        self.underruns = 0
+        self.overruns = 0
+        self.status_errors = 0
+        self.blocks_processed = 0
+        self.max_process_time = 0.0
+
+        self._running = False
+        self._reprime = False
+        self._thread = None
+
+    def start(self):
+        """Prime the output with the safety margin and start the DSP thread"""
+        self.input_ring.clear()
+        self.output_ring.clear()
+        prime_output(self.output_ring, self.margin_blocks * self.blocksize)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="dsp", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the DSP thread"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def callback(self, indata, outdata, frames, time_info, status):
+        """PortAudio callback: copy in and out of the rings, nothing else"""
+        if status:
+            self.status_errors += 1
+
+        if self.input_ring.write(indata) < frames:
+            self.overruns += 1
+
+        # After a stall the DSP thread catches up in a burst; drop the backlog
+        # beyond the safety margin so latency does not creep up
+        excess = self.output_ring.available() - (self.margin_blocks + 1) * self.blocksize
+        if excess > 0:
+            self.output_ring.skip(excess)
+
+        read = self.output_ring.read_into(outdata)
+        if read < frames:
+            outdata[read:] = 0
+            self.underruns += 1
+            self._request_reprime()
+
+    def _request_reprime(self):
+        """Ask the producer to restore the safety margin after an underrun"""
+        self._reprime = True
+
+    def _run(self):
+        """DSP thread: process whole blocks as soon as they arrive"""
+        idle = self.blocksize / self.rate / 4
+        while self._running:
+            if self._reprime:
+                self._reprime = False
+                prime_output(self.output_ring, self.margin_blocks * self.blocksize)
+            if self.input_ring.available() < self.blocksize or self.output_ring.space() < self.blocksize:
+                time.sleep(idle)
+                continue
+
+            self.input_ring.read_into(self._in_block)
+            started = time.perf_counter()
+            try:
+                result = self.process(self._in_block.copy())
+                result = RealTime.match_channels(result, self.channels_out)
+            except Exception as e:
+                result = np.zeros((self.blocksize, self.channels_out), dtype=np.float32)
+                if self.on_error:
+                    self.on_error(e)
+            self.max_process_time = max(self.max_process_time, time.perf_counter() - started)
+
+            self.output_ring.write(result)
+            self.blocks_processed += 1
+
+    def latency_ms(self):
+        """Latency added by the safety margin"""
+        return 1000.0 * self.margin_blocks * self.blocksize / self.rate
+
+    def stats(self):
+        """Snapshot of buffer fill levels and dropout counters"""
+        return {
+            'input_fill': self.input_ring.available() / self.input_ring.capacity,
+            'output_fill': self.output_ring.available() / self.output_ring.capacity,
+            'output_frames': self.output_ring.available(),
+            'underruns': self.underruns,
+            'overruns': self.overruns,
+            'status_errors': self.status_errors,
+            'blocks_processed': self.blocks_processed,
+            'max_process_ms': 1000.0 * self.max_process_time,
+            'latency_ms': self.latency_ms(),
+        }
+
+# Layout of the shared control block (float64 slots)
+CTRL_STOP = 0
+CTRL_HEARTBEAT = 1
+CTRL_SEQUENCE = 2
+CTRL_ERRORS = 3
+CTRL_BLOCKS = 4
+CTRL_MAX_MS = 5
+CTRL_REPRIME = 6
+CTRL_PARAMS = 8
+PARAM_KEYS = list(RealTime.DEFAULT_PARAMS)
+
+def create_shared_ring(capacity, channels):
+    """
+    Allocate a RingBuffer in shared memory and return it with its segment
+    """
+    shm = shared_memory.SharedMemory(create=True, size=16 + capacity * channels * 4)
+    return _ring_from_shm(shm, capacity, channels), shm
+
+def attach_shared_ring(name, capacity, channels):
+    """Attach to a RingBuffer created by ``create_shared_ring``"""
+    shm = shared_memory.SharedMemory(name=name)
+    return _ring_from_shm(shm, capacity, channels), shm
+
+def _ring_from_shm(shm, capacity, channels):
+    counters = np.ndarray((2,), dtype=np.int64, buffer=shm.buf, offset=0)
+    storage = np.ndarray((capacity, channels), dtype=np.float32, buffer=shm.buf, offset=16)
+    return RingBuffer(capacity, channels, storage=storage, counters=counters)
+
+def write_params(control, params):
+    """
+    Publish effect settings to the control block (seqlock: odd while writing)
+    """
+    control[CTRL_SEQUENCE] += 1
+    for i, key in enumerate(PARAM_KEYS):
+        control[CTRL_PARAMS + i] = float(params[key])
+    control[CTRL_SEQUENCE] += 1
+
+def read_params(control, params):
+    """
+    Read effect settings from the control block, keeping ``params`` on a torn read
+    """
+    sequence = control[CTRL_SEQUENCE]
+    if sequence % 2:
+        return params
+    values = control[CTRL_PARAMS:CTRL_PARAMS + len(PARAM_KEYS)].copy()
+    if control[CTRL_SEQUENCE] != sequence:
+        return params
+    return {
+        key: type(RealTime.DEFAULT_PARAMS[key])(value)
+        for key, value in zip(PARAM_KEYS, values)
+    }
+
+def _worker_main(input_name, output_name, control_name, capacity, channels_in,
+                 channels_out, blocksize, rate, margin_frames, profile_device):
+    """Entry point of the DSP worker process"""
+    input_ring, input_shm = attach_shared_ring(input_name, capacity, channels_in)
+    output_ring, output_shm = attach_shared_ring(output_name, capacity, channels_out)
+    control_shm = shared_memory.SharedMemory(name=control_name)
+    control = np.ndarray((CTRL_PARAMS + len(PARAM_KEYS),), dtype=np.float64, buffer=control_shm.buf)
+
+    chain = RealTime.EffectChain(rate)
+    if profile_device:
+        chain.noise_reducer.load_profile(profile_device)
+    params = read_params(control, dict(RealTime.DEFAULT_PARAMS))
+
+    # Warm up librosa and the compiled kernels before taking audio so the first block is not late
+    control[CTRL_HEARTBEAT] = time.monotonic()
+    RealTime.warm_up()
+    chain.process(np.zeros((blocksize, channels_in), dtype=np.float32), dict(params, noise_reduction=False))
+    chain.vad.reset()
+
+    # Input that piled up while starting (or restarting) is stale by now
+    input_ring.skip(input_ring.available())
+
+    block = np.zeros((blocksize, channels_in), dtype=np.float32)
+    idle = blocksize / rate / 4
+    try:
+        while not control[CTRL_STOP]:
+            control[CTRL_HEARTBEAT] = time.monotonic()
+            if control[CTRL_REPRIME]:
+                control[CTRL_REPRIME] = 0
+                prime_output(output_ring, margin_frames)
+            if input_ring.available() < blocksize or output_ring.space() < blocksize:
+                time.sleep(idle)
+                continue
+
+            params = read_params(control, params)
+            input_ring.read_into(block)
+            started = time.perf_counter()
+            try:
+                result = RealTime.match_channels(chain.process(block.copy(), params), channels_out)
+            except Exception:
+                result = np.zeros((blocksize, channels_out), dtype=np.float32)
+                control[CTRL_ERRORS] += 1
+            control[CTRL_MAX_MS] = max(control[CTRL_MAX_MS], 1000.0 * (time.perf_counter() - started))
+
+            output_ring.write(result)
+            control[CTRL_BLOCKS] += 1
+
+        if profile_device:
+            chain.noise_reducer.save_profile(profile_device)
+    finally:
+        del input_ring, output_ring, control
+        input_shm.close()
+        output_shm.close()
+        control_shm.close()
+
+class ProcessPipeline(AudioPipeline):
+    """
+    Runs the effect chain in a child process behind shared-memory rings
+
+    Keeps the audio path away from the GIL held by the GUI. Settings travel
+    through a shared control block, and a supervisor thread restarts the
+    worker if it dies or stops sending heartbeats.
+    """
+    def __init__(self, params, blocksize=RealTime.CHUNK, channels_in=1, channels_out=2,
+                 margin_blocks=2, capacity_blocks=16, rate=RealTime.RATE,
+                 profile_device=None, heartbeat_timeout=10.0):
+        super().__init__(None, blocksize, channels_in, channels_out,
+                         margin_blocks, capacity_blocks, rate)
+        self.profile_device = profile_device
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restarts = 0
+
+        capacity = self.input_ring.capacity
+        self.input_ring, self._input_shm = create_shared_ring(capacity, channels_in)
+        self.output_ring, self._output_shm = create_shared_ring(capacity, channels_out)
+        self._control_shm = shared_memory.SharedMemory(create=True, size=8 * (CTRL_PARAMS + len(PARAM_KEYS)))
+        self.control = np.ndarray((CTRL_PARAMS + len(PARAM_KEYS),), dtype=np.float64,
+                                  buffer=self._control_shm.buf)
+        self.control[:] = 0
+        self.input_ring.counters[:] = 0
+        self.output_ring.counters[:] = 0
+        write_params(self.control, params)
+
+        self._process = None
+        self._supervisor = None
+        self._released = False
+
+    def _request_reprime(self):
+        self.control[CTRL_REPRIME] = 1
+
+    def set_params(self, params):
+        """Hand new effect settings to the worker"""
+        write_params(self.control, params)
+
+    def _spawn(self):
+        self.control[CTRL_HEARTBEAT] = time.monotonic()
+        self._process = mp.get_context("spawn").Process(
+            target=_worker_main,
+            args=(self._input_shm.name, self._output_shm.name, self._control_shm.name,
+                  self.input_ring.capacity, self.channels_in, self.channels_out,
+                  self.blocksize, self.rate, self.margin_blocks * self.blocksize,
+                  self.profile_device),
+            name="dsp-worker",
+            daemon=True,
+        )
+        self._process.start()
+
+    def start(self):
+        """Prime the output, launch the worker and its supervisor"""
+        self.input_ring.clear()
+        self.output_ring.clear()
+        prime_output(self.output_ring, self.margin_blocks * self.blocksize)
+        self.control[CTRL_STOP] = 0
+        self._running = True
+        self._spawn()
+        self._supervisor = threading.Thread(target=self._supervise, name="dsp-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _supervise(self):
+        """Restart the worker when it crashes or hangs"""
+        while self._running:
+            time.sleep(0.2)
+            if not self._running:
+                break
+            stalled = time.monotonic() - self.control[CTRL_HEARTBEAT] > self.heartbeat_timeout
+            if self._process.is_alive() and not stalled:
+                continue
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process.join(timeout=1.0)
+            self.restarts += 1
+            self._spawn()
+
+    def stop(self):
+        """
+        Ask the worker to finish, then release the shared memory
+
+        Safe to call after a failed ``start`` (or without one) and more
+        than once; the segments are unlinked only the first time.
+        """
+        if self._released:
+            return
+        self._running = False
+        self.control[CTRL_STOP] = 1
+        if self._supervisor is not None:
+            self._supervisor.join(timeout=1.0)
+            self._supervisor = None
+        if self._process is not None:
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+
+        # Keep private copies for stats() so the shared views can be released
+        self.control = np.array(self.control)
+        self.input_ring = RingBuffer(self.input_ring.capacity, self.channels_in,
+                                     np.array(self.input_ring.buffer), np.array(self.input_ring.counters))
+        self.output_ring = RingBuffer(self.output_ring.capacity, self.channels_out,
+                                      np.array(self.output_ring.buffer), np.array(self.output_ring.counters))
+        for shm in (self._input_shm, self._output_shm, self._control_shm):
+            shm.close()
+            shm.unlink()
+        self._released = True
+
+    def stats(self):
+        """Ring statistics plus worker health"""
+        stats = super().stats()
+        stats['blocks_processed'] = int(self.control[CTRL_BLOCKS])
+        stats['max_process_ms'] = float(self.control[CTRL_MAX_MS])
+        stats['worker_errors'] = int(self.control[CTRL_ERRORS])
+        stats['restarts'] = self.restarts
+        return stats
@@ -0,0 +1,220 @@
+import collections
+import threading
+import time
+import numpy as np
+import sounddevice as sd
+
+import RealTime
+import Pipeline
+
+def output_channels(channels, device=None):
+    """``channels``, limited to what the output device can play"""
+    return max(1, min(channels, sd.query_devices(device, 'output')['max_output_channels']))
+
+class StreamingPlayer:
+    """
+    Plays rendered audio while the rest of the file is still being rendered
+
+    The render thread appends chunks with ``feed``; the output stream
+    callback reads from ``position``, so the playback position is exact and
+    can be moved with ``seek``. Reaching the render front plays silence
+    until more audio arrives.
+    """
+    def __init__(self, total_frames, channels=1, rate=RealTime.RATE):
+        self.total_frames = total_frames
+        self.channels = channels
+        self.rate = rate
+        self.buffer = np.zeros((total_frames, channels), dtype=np.float32)
+        self.rendered = 0
+        self.position = 0
+        self.finished = False
+        self.underruns = 0
+        self.stream = None
+        self._out_channels = channels
+
+    def feed(self, chunk):
+        """Append a rendered chunk (render thread)"""
+        chunk = RealTime.as_channels(chunk)
+        frames = min(len(chunk), self.total_frames - self.rendered)
+        self.buffer[self.rendered:self.rendered + frames] = chunk[:frames]
+        # Publish only after the samples are in place
+        self.rendered += frames
+
+    def finish(self):
+        """Mark rendering as complete"""
+        self.finished = True
+
+    @property
+    def audio(self):
+        """The rendered audio, shaped like the source"""
+        return self.buffer[:self.rendered] if self.channels > 1 else self.buffer[:self.rendered, 0]
+
+    @property
+    def active(self):
+        return self.stream is not None and self.stream.active
+
+    def progress(self):
+        """Playback position as a fraction of the whole file"""
+        return self.position / self.total_frames if self.total_frames else 0.0
+
+    def render_progress(self):
+        """Rendered part as a fraction of the whole file"""
+        return self.rendered / self.total_frames if self.total_frames else 0.0
+
+    def seek(self, fraction):
+        """Move the playback position to a fraction of the file"""
+        self.position = int(min(max(fraction, 0.0), 1.0) * self.total_frames)
+
+    def play(self):
+        """Start (or resume) playback from the current position"""
+        if self.position >= self.total_frames:
+            self.position = 0
+        self._out_channels = output_channels(self.channels)
+        self.stream = sd.OutputStream(
+            samplerate=self.rate,
+            channels=self._out_channels,
+            blocksize=RealTime.CHUNK,
+            dtype=np.float32,
+            callback=self._callback,
+        )
+        self.stream.start()
+
+    def stop(self):
+        """Stop playback, keeping the position"""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def _callback(self, outdata, frames, time, status):
+        position = self.position
+        count = max(0, min(frames, self.rendered - position))
+        # Files with more channels than the device are folded onto its outputs
+        outdata[:count] = RealTime.match_channels(self.buffer[position:position + count],
+                                                  self._out_channels)
+        outdata[count:] = 0
+        self.position = position + count
+
+        if count < frames:
+            if self.finished and self.position >= self.total_frames:
+                raise sd.CallbackStop
+            self.underruns += 1
+
+class PreviewPlayer:
+    """
+    Loops a short window of the source through the realtime effect chain
+
+    A producer thread keeps only ``lookahead_seconds`` of processed audio
+    queued ahead of the playhead. When the settings change (or the window
+    moves) the queued blocks are dropped and just that stretch is
+    re-rendered, so slider moves are heard almost immediately.
+    """
+    def __init__(self, source, get_params, rate=RealTime.RATE, window_seconds=3.0,
+                 lookahead_seconds=0.3):
+        self.source = RealTime.as_channels(source)
+        self.get_params = get_params
+        self.rate = rate
+        # Play on at most the device's channels; rendered blocks are folded onto them
+        self.channels = output_channels(self.source.shape[1])
+        self.blocksize = RealTime.CHUNK
+        self.window_frames = min(int(window_seconds * rate), len(self.source))
+        self.lookahead_frames = max(1, int(lookahead_seconds * rate / self.blocksize)) * self.blocksize
+
+        self.chain = RealTime.EffectChain(rate)
+        self.chain.noise_reducer.learn(self.source[:rate // 2])
+
+        self.ring = Pipeline.RingBuffer(self.lookahead_frames + self.blocksize, self.channels)
+        self.blocks = collections.deque()  # (generation, source position) per queued block
+        self.generation = 0
+        self.window_start = 0
+        self.playhead = 0
+        self.underruns = 0
+
+        self._params = None
+        self._rewind = True
+        self._cursor = 0
+        self._running = False
+        self._thread = None
+        self.stream = None
+
+    def _advance(self, position, frames):
+        """Move a source position forward, wrapping inside the loop window"""
+        return self.window_start + (position - self.window_start + frames) % self.window_frames
+
+    def seek(self, fraction):
+        """Center the loop window on a fraction of the file"""
+        position = int(min(max(fraction, 0.0), 1.0) * len(self.source))
+        start = position - self.window_frames // 3
+        self.window_start = min(max(start, 0), len(self.source) - self.window_frames)
+        self.playhead = min(max(position, self.window_start), self.window_start + self.window_frames - 1)
+        self._rewind = True
+
+    def progress(self):
+        """Playhead as a fraction of the whole file"""
+        return self.playhead / len(self.source) if len(self.source) else 0.0
+
+    def start(self, fraction=0.0):
+        """Start looping around ``fraction`` of the file"""
+        self.seek(fraction)
+        self._running = True
+        self._thread = threading.Thread(target=self._render, name="preview", daemon=True)
+        self._thread.start()
+        self.stream = sd.OutputStream(
+            samplerate=self.rate,
+            channels=self.channels,
+            blocksize=self.blocksize,
+            dtype=np.float32,
+            callback=self._callback,
+        )
+        self.stream.start()
+
+    def stop(self):
+        """Stop playback and the render thread"""
+        self._running = False
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _render(self):
+        """Producer: keep the look-ahead filled with the current settings"""
+        idle = self.blocksize / self.rate / 4
+        while self._running:
+            params = self.get_params()
+            if params != self._params or self._rewind:
+                # Everything queued is stale; render again from the playhead
+                self._params = params
+                self._rewind = False
+                self.generation += 1
+                self._cursor = self.playhead
+
+            if self.ring.space() < self.blocksize or self.ring.available() >= self.lookahead_frames:
+                time.sleep(idle)
+                continue
+
+            # Gather one block from the loop window, wrapping at its end
+            block = self.source[self._advance(self._cursor, np.arange(self.blocksize))]
+            result = RealTime.match_channels(self.chain.process(block, params), self.channels)
+
+            self.ring.write(result)
+            self.blocks.append((self.generation, self._cursor))
+            self._cursor = self._advance(self._cursor, self.blocksize)
+
+    def _callback(self, outdata, frames, time_info, status):
+        # Drop blocks rendered with old settings or for an old window
+        generation = self.generation
+        while self.blocks and self.blocks[0][0] != generation:
+            self.blocks.popleft()
+            self.ring.skip(self.blocksize)
+
+        if not self.blocks:
+            outdata.fill(0)
+            self.underruns += 1
+            return
+
+        _, position = self.blocks.popleft()
+        self.ring.read_into(outdata)
+        self.playhead = self._advance(position, frames)
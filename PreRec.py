@@ -2,18 +2,83 @@ import numpy as np
 import librosa
 import soundfile as sf
 import RealTime
+import AudioCache
+import Loudness
+import Manifest
 import os
+import sys
+import io
+import json
+import time
+import queue
+import threading
+import contextlib
+import multiprocessing
+import cProfile
+import pstats
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from scipy import signal
 
+# Length of the pieces a long file is split into for parallel rendering
+SEGMENT_SECONDS = 30.0
+
+def render_pool(workers=None):
+    """
+    Pool of render workers, spawned rather than forked: we are called from
+    GUI threads while PortAudio and playback threads run, and a fork of a
+    multi-threaded process can deadlock
+
+    Spawning a worker and importing the DSP modules takes seconds, so keep
+    one pool around and pass it as ``pool`` to the render functions.
+    """
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+@contextlib.contextmanager
+def _using_pool(workers, pool=None):
+    """The caller's ``pool``, left running, or a new one for this call only"""
+    if pool is not None:
+        yield pool
+        return
+    own = render_pool(workers)
+    try:
+        yield own
+    finally:
+        own.shutdown(cancel_futures=True)
+
+# Output container and default sample format for each file extension
+OUTPUT_FORMATS = {
+    '.wav': ('WAV', 'FLOAT'),
+    '.flac': ('FLAC', 'PCM_24'),
+    '.ogg': ('OGG', 'VORBIS'),
+    '.mp3': ('MP3', 'MPEG_LAYER_III'),
+}
+
 class AudioProcessingTask:
-    """Class to track audio processing progress"""
-    def __init__(self):
+    """
+    Class to track audio processing progress
+
+    Work done under ``stage(name)`` is also profiled per stage: wall time,
+    CPU time (process-wide, so writer threads count too), samples processed
+    and, with ``track_memory``, the peak of temporary allocations. Nested
+    stages are subtracted from their parent. ``profile`` additionally runs
+    cProfile during the stages.
+    """
+    def __init__(self, track_memory=False, profile=False):
         self.progress = 0.0
         self.is_canceled = False
         self.is_complete = False
         self.result = None
         self.error = None
 
+        self.track_memory = track_memory
+        self.profiler = cProfile.Profile() if profile else None
+        self.stages = {}
+        self.files = {}
+        self._stack = []
+        self._started_tracing = False
+
     def update_progress(self, value):
         """Update progress value (0-1)"""
         self.progress = value
@@ -33,11 +98,176 @@ class AudioProcessingTask:
         self.error = error
         self.is_complete = True
 
+    @contextlib.contextmanager
+    def stage(self, name, samples=0):
+        """
+        Profile the enclosed work as stage ``name``; the yielded dict's
+        'samples' may be set inside when the count is only known there
+        """
+        if not self._stack:
+            # Outermost stage: switch the heavier instruments on
+            if self.track_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if self.profiler:
+                self.profiler.enable()
+
+        record = {'samples': samples, 'child_wall': 0.0, 'child_cpu': 0.0, 'peak': 0}
+        memory = self.track_memory and tracemalloc.is_tracing()
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            record['base'] = current
+        self._stack.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._stack.pop()
+
+            stats = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'samples': 0,
+                                                  'calls': 0, 'peak_bytes': 0})
+            stats['wall'] += wall - record['child_wall']
+            stats['cpu'] += cpu - record['child_cpu']
+            stats['samples'] += record['samples']
+            stats['calls'] += 1
+            if memory:
+                peak = max(record['peak'], tracemalloc.get_traced_memory()[1])
+                stats['peak_bytes'] = max(stats['peak_bytes'], peak - record['base'])
+
+            if self._stack:
+                parent = self._stack[-1]
+                parent['child_wall'] += wall
+                parent['child_cpu'] += cpu
+                if memory:
+                    parent['peak'] = max(parent['peak'], peak)
+            else:
+                if self.profiler:
+                    self.profiler.disable()
+                if self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+
+    def merge(self, other, label=None):
+        """Add another task's stage totals to ours, keeping its breakdown under ``label``"""
+        for name, theirs in other.stages.items():
+            stats = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'samples': 0,
+                                                  'calls': 0, 'peak_bytes': 0})
+            for key in ('wall', 'cpu', 'samples', 'calls'):
+                stats[key] += theirs[key]
+            stats['peak_bytes'] = max(stats['peak_bytes'], theirs['peak_bytes'])
+        if label is not None:
+            self.files[label] = other.report()['stages']
+
+    def report(self):
+        """Stage totals with throughput (seconds of audio per second of wall time)"""
+        stages = {}
+        for name, stats in self.stages.items():
+            audio_seconds = stats['samples'] / RealTime.RATE
+            stages[name] = {
+                'wall_s': stats['wall'],
+                'cpu_s': stats['cpu'],
+                'samples': stats['samples'],
+                'calls': stats['calls'],
+                'peak_mb': stats['peak_bytes'] / 2 ** 20,
+                'realtime_factor': audio_seconds / stats['wall'] if stats['wall'] > 0 else None,
+            }
+        report = {
+            'total_wall_s': sum(stats['wall'] for stats in self.stages.values()),
+            'total_cpu_s': sum(stats['cpu'] for stats in self.stages.values()),
+            'stages': stages,
+        }
+        if self.files:
+            report['files'] = self.files
+        return report
+
+    def to_json(self, file_path=None):
+        """The report as JSON, also written to ``file_path`` if given"""
+        text = json.dumps(self.report(), indent=2)
+        if file_path:
+            with open(file_path, 'w') as f:
+                f.write(text)
+        return text
+
+    def profile_stats(self, limit=25, sort='cumulative'):
+        """Top of the cProfile output (empty unless created with ``profile``)"""
+        if not self.profiler:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+def _stage(task, name, samples=0):
+    """``task.stage`` that also works without a task"""
+    return task.stage(name, samples) if task is not None else contextlib.nullcontext({})
+
+def _timed(iterable, task, name):
+    """Yield from ``iterable``, profiling the production of each item as a stage"""
+    iterator = iter(iterable)
+    while True:
+        with _stage(task, name) as record:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            record['samples'] = len(item)
+        yield item
+
+def load_audio(file_path):
+    """
+    Load an audio file at the processing rate as (frames,) or (frames, channels)
+
+    Decodes go through AudioCache, so the result may be a read-only memory map.
+    """
+    return AudioCache.load(file_path, RealTime.RATE)
+
+def open_audio(file_path, gate_threshold=0.1, noise_reduction=False, task=None):
+    """
+    Load a file for chunked rendering: the audio and the gate levels to
+    apply per chunk (None without a gate)
+
+    The decode stays memory-mapped (see AudioCache), so the file is never
+    held in memory as a whole, except with noise reduction, which still
+    produces a denoised copy of the whole recording.
+    """
+    with _stage(task, 'decode') as record:
+        audio_data = load_audio(file_path)
+        record['samples'] = len(audio_data)
+    if noise_reduction:
+        with _stage(task, 'noise_reduction', len(audio_data)):
+            audio_data = RealTime.reduce_noise(audio_data, RealTime.RATE)
+    gate = None
+    if gate_threshold > 0:
+        with _stage(task, 'gate'):
+            gate = RealTime.gate_levels(audio_data, gate_threshold)
+    return audio_data, gate
+
+def prepare_audio(file_path, gate_threshold=0.1, noise_reduction=False, task=None):
+    """
+    Load a file and apply the whole-file stages (noise reduction and gate)
+    """
+    audio_data, gate = open_audio(file_path, gate_threshold, noise_reduction, task)
+    if gate is not None:
+        with _stage(task, 'gate', len(audio_data)):
+            audio_data = RealTime.apply_gate(audio_data, gate)
+    return audio_data
+
 def process_audio(file_path, pitch_shift=0, volume=1.0, echo=0, reverb=0, 
                   gate_threshold=0.1, low_cut=True, high_cut=True, 
-                  callback=None, task=None):
+                  noise_reduction=False, workers=1, callback=None, task=None, tone=None,
+                  skip_silence=False, pool=None):
     """
     Process pre-recorded audio file with effects
+
+    ``tone`` holds the EQ settings passed to ``RealTime.init_filter``
+    (cut frequencies and bass/mid/treble gains). ``skip_silence`` renders
+    only the speech found by the voice activity detector (see
+    ``render_regions``). With ``workers`` > 1, files longer than two segments are rendered in
+    parallel segments (see ``render_parallel``), on ``pool`` when one is given.
     """
     try:
         # Create task object if not provided
@@ -50,60 +280,93 @@ def process_audio(file_path, pitch_shift=0, volume=1.0, echo=0, reverb=0,
             callback("Loading audio file...")
             
         # Load audio file
-        audio_data, sample_rate = librosa.load(file_path, sr=RealTime.RATE)
+        with task.stage('decode') as record:
+            audio_data = load_audio(file_path)
+            record['samples'] = len(audio_data)
+        samples = len(audio_data)
         
         # Update progress
         task.update_progress(0.3)
         if callback:
             callback("Applying effects...")
             
+        # Apply spectral noise reduction before the gate
+        if noise_reduction:
+            if callback:
+                callback("Reducing background noise...")
+            with task.stage('noise_reduction', samples):
+                audio_data = RealTime.reduce_noise(audio_data, RealTime.RATE)
+            
         # Apply noise gate if threshold > 0
         if gate_threshold > 0:
-            audio_data = RealTime.noise_gate(audio_data, gate_threshold)
-            
-        # Apply filters
-        filters = RealTime.init_filter()
-        audio_data = RealTime.apply_filter(audio_data, filters, low_cut, high_cut)
-        
-        # Update progress
-        task.update_progress(0.5)
-        if task.is_canceled:
-            return None
+            with task.stage('gate', samples):
+                audio_data = RealTime.noise_gate(audio_data, gate_threshold)
             
-        # Apply pitch shift if not zero
-        if pitch_shift != 0:
+        if skip_silence:
+            # Render only around speech; long silent stretches stay silent
+            regions = RealTime.speech_regions(audio_data, RealTime.RATE)
+            speech = sum(end - start for start, end in regions)
             if callback:
-                callback("Shifting pitch...")
-            audio_data = RealTime.pitch_shift(audio_data, RealTime.RATE, pitch_shift)
-            
-        # Update progress
-        task.update_progress(0.7)
-        if task.is_canceled:
-            return None
-            
-        # Apply echo if > 0
-        if echo > 0:
+                callback(f"Skipping {1 - speech / max(len(audio_data), 1):.0%} silence...")
+            with task.stage('render', samples):
+                audio_data = render_regions(audio_data, regions, pitch_shift, echo, reverb,
+                                            low_cut, high_cut, workers=workers, tone=tone,
+                                            pool=pool)
+        elif workers > 1 and pitch_shift == 0 and len(audio_data) > 2 * int(SEGMENT_SECONDS * RealTime.RATE):
+            # Render filters, echo and reverb on all cores (a pitch shift runs in order below)
             if callback:
-                callback("Adding echo...")
-            audio_data = RealTime.add_echo(audio_data, echo)
+                callback(f"Rendering on {workers} workers...")
+            with task.stage('render', samples):
+                audio_data = render_parallel(audio_data, pitch_shift, echo, reverb,
+                                             low_cut, high_cut, workers=workers, task=task,
+                                             tone=tone, pool=pool)
+            if audio_data is None:
+                return None
+        else:
+            # Apply filters
+            with task.stage('filter', samples):
+                filters = RealTime.init_filter(**(tone or {}))
+                audio_data = RealTime.apply_filter(audio_data, filters, low_cut, high_cut)
             
-        # Apply reverb if > 0
-        if reverb > 0:
-            if callback:
-                callback("Adding reverb...")
-            audio_data = RealTime.add_reverb(audio_data, reverb)
+            # Update progress
+            task.update_progress(0.5)
+            if task.is_canceled:
+                return None
+                
+            # Apply pitch shift if not zero
+            if pitch_shift != 0:
+                if callback:
+                    callback("Shifting pitch...")
+                with task.stage('pitch', samples):
+                    audio_data = RealTime.pitch_shift(audio_data, RealTime.RATE, pitch_shift)
+                
+            # Update progress
+            task.update_progress(0.7)
+            if task.is_canceled:
+                return None
+                
+            # Apply echo if > 0
+            if echo > 0:
+                if callback:
+                    callback("Adding echo...")
+                with task.stage('echo', samples):
+                    audio_data = RealTime.add_echo(audio_data, echo)
+                
+            # Apply reverb if > 0
+            if reverb > 0:
+                if callback:
+                    callback("Adding reverb...")
+                with task.stage('reverb', samples):
+                    audio_data = RealTime.add_reverb(audio_data, reverb)
             
-        # Apply volume
-        audio_data = audio_data * volume
-        
         # Update progress
         task.update_progress(0.9)
         if callback:
             callback("Finalizing...")
             
-        # Normalize to prevent clipping
-        if np.max(np.abs(audio_data)) > 0.99:
-            audio_data = audio_data / np.max(np.abs(audio_data)) * 0.99
+        # Apply volume and limit the peaks in one streaming pass
+        with task.stage('normalize', samples):
+            audio_data = RealTime.limit(audio_data * volume)
             
         # Mark task as complete
         task.complete(audio_data)
@@ -119,7 +382,359 @@ def process_audio(file_path, pitch_shift=0, volume=1.0, echo=0, reverb=0,
             callback(f"Error: {e}")
         raise e
 
-def save_audio(audio_data, file_path, callback=None):
+def segment_overlap():
+    """
+    Return (context, fade) in samples for parallel segments
+
+    ``context`` is the extra audio rendered before and after a segment so the
+    filter, pitch-shift STFT, echo and reverb tails are complete inside it;
+    ``fade`` is the crossfade between neighbouring segments.
+    """
+    n_fft = 2048
+    tail = RealTime.ECHO_DELAY + RealTime.REVERB_DELAY * RealTime.REVERB_TAPS
+    context = int(tail * RealTime.RATE) + 4 * n_fft
+    fade = 2 * n_fft
+    return context, fade
+
+def _segment_jobs(total, segment_seconds):
+    """
+    Split ``total`` frames into (render_start, keep_start, keep_end, render_end)
+    jobs; neighbouring keep ranges overlap by one crossfade
+    """
+    segment_len = int(segment_seconds * RealTime.RATE)
+    context, fade = segment_overlap()
+
+    # Segment boundaries; a runt at the end is merged into the previous segment
+    bounds = list(range(0, total, segment_len)) + [total]
+    if len(bounds) > 2 and bounds[-1] - bounds[-2] < fade:
+        del bounds[-2]
+
+    jobs = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        keep_start = max(0, start - fade // 2)
+        keep_end = min(total, end + fade - fade // 2)
+        render_start = max(0, keep_start - context)
+        render_end = min(total, keep_end + context)
+        jobs.append((render_start, keep_start, keep_end, render_end))
+    return jobs
+
+def _render_segment(segment, pitch_shift, echo, reverb, low_cut, high_cut, keep_start, keep_end,
+                    tone=None, task=None, gate=None):
+    """
+    Render one padded segment (everything but the volume and the limiter)
+
+    ``gate`` holds the levels of a noise gate still to be applied (see
+    ``open_audio``).
+    """
+    samples = keep_end - keep_start
+    if gate is not None:
+        with _stage(task, 'gate', samples):
+            segment = RealTime.apply_gate(segment, gate)
+    with _stage(task, 'filter', samples):
+        filters = RealTime.init_filter(**(tone or {}))
+        audio_data = RealTime.apply_filter(segment, filters, low_cut, high_cut)
+    if pitch_shift != 0:
+        with _stage(task, 'pitch', samples):
+            audio_data = RealTime.pitch_shift(audio_data, RealTime.RATE, pitch_shift)
+
+    if echo > 0:
+        with _stage(task, 'echo', samples):
+            audio_data = RealTime.add_echo(audio_data, echo)
+    if reverb > 0:
+        with _stage(task, 'reverb', samples):
+            audio_data = RealTime.add_reverb(audio_data, reverb)
+
+    return audio_data[keep_start:keep_end].astype(np.float32)
+
+def _render_stream(audio_data, pitch_shift, echo, reverb, low_cut, high_cut, tone=None,
+                   task=None, gate=None, chunk_seconds=5.0):
+    """
+    Render in order, one chunk at a time, with every stage carrying its state
+    into the next chunk (everything but the volume and the limiter)
+
+    Used whenever the pitch is shifted: the phase vocoder's output can't be
+    crossfaded between separately rendered segments without level steps at
+    the seams, so its phases run through the whole file instead. The result
+    matches the serial render.
+    """
+    chunk_len = int(chunk_seconds * RealTime.RATE)
+    filters = RealTime.init_filter(**(tone or {}))
+    filters.set_band('low_cut', enabled=low_cut)
+    filters.set_band('high_cut', enabled=high_cut)
+    echo_line = RealTime.echo_delay()
+    reverb_line = RealTime.reverb_delay()
+
+    def filtered():
+        for start in range(0, len(audio_data), chunk_len):
+            chunk = audio_data[start:start + chunk_len]
+            with _stage(task, 'filter', len(chunk)):
+                if gate is not None:
+                    chunk = RealTime.apply_gate(chunk, gate)
+                chunk = filters.process(chunk)
+            yield chunk
+
+    for chunk in _timed(RealTime.pitch_stream(filtered(), RealTime.RATE, pitch_shift), task, 'pitch'):
+        if echo > 0:
+            with _stage(task, 'echo', len(chunk)):
+                chunk = echo_line.process(chunk, RealTime.echo_gains(echo))
+        if reverb > 0:
+            with _stage(task, 'reverb', len(chunk)):
+                chunk = reverb_line.process(chunk, RealTime.reverb_gains(reverb))
+        yield chunk.astype(np.float32)
+
+def _crossfade_weights(length, fade_in, fade_out):
+    """Linear crossfade ramps, which sum to one over identical overlaps"""
+    weights = np.ones(length, dtype=np.float32)
+    if fade_in:
+        weights[:fade_in] = (np.arange(fade_in) + 0.5) / fade_in
+    if fade_out:
+        weights[length - fade_out:] *= 1 - (np.arange(fade_out) + 0.5) / fade_out
+    return weights
+
+def render_parallel(audio_data, pitch_shift=0, echo=0, reverb=0, low_cut=True, high_cut=True,
+                    workers=None, segment_seconds=SEGMENT_SECONDS, task=None, tone=None, pool=None):
+    """
+    Render filters, pitch shift, echo and reverb over overlapping segments in
+    worker processes (``pool``, else a new pool of ``workers``) and stitch
+    them back with crossfades
+
+    A pitch shift is not split up: it is rendered in order by
+    ``_render_stream`` instead, which keeps the phase vocoder coherent.
+    """
+    if pitch_shift != 0:
+        return np.concatenate(list(_render_stream(audio_data, pitch_shift, echo, reverb,
+                                                  low_cut, high_cut, tone)))
+
+    workers = workers or os.cpu_count() or 1
+    jobs = _segment_jobs(len(audio_data), segment_seconds)
+    _, fade = segment_overlap()
+
+    output = np.zeros(audio_data.shape, dtype=np.float32)
+    with _using_pool(workers, pool) as executor:
+        futures = {
+            executor.submit(_render_segment, audio_data[render_start:render_end], pitch_shift,
+                        echo, reverb, low_cut, high_cut,
+                        keep_start - render_start, keep_end - render_start, tone): i
+            for i, (render_start, keep_start, keep_end, render_end) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures)):
+            if task and task.is_canceled:
+                for pending in futures:
+                    pending.cancel()
+                return None
+
+            i = futures[future]
+            segment = future.result()
+            _, keep_start, keep_end, _ = jobs[i]
+            # Without a pitch shift the overlaps are identical, so linear ramps sum to one
+            weights = _crossfade_weights(keep_end - keep_start,
+                                         fade if i > 0 else 0,
+                                         fade if i < len(jobs) - 1 else 0)
+            output[keep_start:keep_end] += segment * weights.reshape((-1,) + (1,) * (segment.ndim - 1))
+
+            if task:
+                task.update_progress(0.3 + 0.6 * (done + 1) / len(jobs))
+
+    return output
+
+def render_regions(audio_data, regions, pitch_shift=0, echo=0, reverb=0, low_cut=True,
+                   high_cut=True, workers=1, tone=None, pool=None):
+    """
+    Render only the given (start, end) regions; everything else is silence
+
+    Each region is rendered on until its echo and reverb tails have died
+    out, with silence as input past its end, like the realtime chain does
+    when the VAD bypasses a block.
+    """
+    tail, fade = segment_overlap()
+    output = np.zeros(audio_data.shape, dtype=np.float32)
+
+    jobs = []
+    for start, end in regions:
+        stop = min(len(audio_data), end + tail)
+        segment = np.zeros((stop - start,) + audio_data.shape[1:], dtype=np.float32)
+        segment[:end - start] = audio_data[start:end]
+        # Fade the cut edges so region boundaries don't click
+        weights = _crossfade_weights(end - start, min(fade, (end - start) // 2),
+                                     min(fade, (end - start) // 2))
+        segment[:end - start] *= weights.reshape((-1,) + (1,) * (segment.ndim - 1))
+        jobs.append((start, stop, segment))
+
+    args = [(segment, pitch_shift, echo, reverb, low_cut, high_cut, 0, len(segment), tone)
+            for _, _, segment in jobs]
+    if (workers > 1 or pool is not None) and len(jobs) > 1:
+        with _using_pool(workers, pool) as executor:
+            rendered = list(executor.map(_render_segment, *zip(*args)))
+    else:
+        rendered = [_render_segment(*job_args) for job_args in args]
+
+    for (start, stop, _), segment in zip(jobs, rendered):
+        output[start:stop] += segment
+    return output
+
+def render_chunks(audio_data, pitch_shift=0, volume=1.0, echo=0, reverb=0, low_cut=True,
+                  high_cut=True, workers=1, chunk_seconds=5.0, tone=None, task=None, gate=None,
+                  pool=None):
+    """
+    Render prepared audio and yield it in order, one chunk at a time
+
+    Used for progressive playback, so nothing here may need the whole
+    result: peaks are bounded by a streaming limiter instead of a global
+    normalization. With ``workers`` > 1 the chunks are rendered ahead in
+    worker processes, on ``pool`` when one is given. A ``task`` gets the time spent rendering (per stage
+    when serial) and limiting. ``gate`` applies the levels from
+    ``open_audio`` chunk by chunk.
+    """
+    chunks = _timed(_stitch_chunks(audio_data, pitch_shift, echo, reverb, low_cut, high_cut,
+                                   workers, chunk_seconds, tone, task, gate, pool),
+                    task, 'render')
+    limited = RealTime.limit_stream(chunk * volume for chunk in chunks)
+    return _timed(limited, task, 'normalize')
+
+def _stitch_chunks(audio_data, pitch_shift, echo, reverb, low_cut, high_cut, workers,
+                   chunk_seconds, tone, task=None, gate=None, pool=None):
+    """Render the chunks of ``render_chunks`` and crossfade them in order"""
+    if pitch_shift != 0:
+        # Crossfaded pitch-shifted chunks leave level steps at the seams, so the
+        # phase vocoder runs through the whole file in order instead
+        yield from _render_stream(audio_data, pitch_shift, echo, reverb, low_cut, high_cut,
+                                  tone, task, gate, chunk_seconds)
+        return
+
+    jobs = _segment_jobs(len(audio_data), chunk_seconds)
+    _, fade = segment_overlap()
+
+    def submit(executor, job):
+        render_start, keep_start, keep_end, render_end = job
+        return executor.submit(_render_segment, audio_data[render_start:render_end], pitch_shift,
+                               echo, reverb, low_cut, high_cut,
+                               keep_start - render_start, keep_end - render_start, tone,
+                               None, gate)
+
+    parallel = workers > 1 or pool is not None
+    with _using_pool(workers, pool) if parallel else contextlib.nullcontext() as executor:
+        # Keep a bounded number of chunks in flight so memory stays flat
+        pending = []
+        next_job = 0
+        tail = None
+        try:
+            for i in range(len(jobs)):
+                if executor:
+                    while next_job < len(jobs) and len(pending) < 2 * workers:
+                        pending.append(submit(executor, jobs[next_job]))
+                        next_job += 1
+                    segment = pending.pop(0).result()
+                else:
+                    render_start, keep_start, keep_end, render_end = jobs[i]
+                    segment = _render_segment(audio_data[render_start:render_end], pitch_shift,
+                                              echo, reverb, low_cut, high_cut,
+                                              keep_start - render_start, keep_end - render_start,
+                                              tone, task, gate)
+
+                last = i == len(jobs) - 1
+                weights = _crossfade_weights(len(segment), fade if i > 0 else 0,
+                                             fade if not last else 0)
+                segment = segment * weights.reshape((-1,) + (1,) * (segment.ndim - 1))
+
+                # Finish the crossfade with the previous chunk, hold back our own tail
+                if tail is not None:
+                    segment[:len(tail)] += tail
+                if not last:
+                    tail = segment[-fade:]
+                    segment = segment[:-fade]
+
+                yield segment
+        finally:
+            # A shared pool keeps running, so drop only our own queued chunks
+            for future in pending:
+                future.cancel()
+
+class AudioWriter:
+    """
+    Streams audio blocks to a file from a background thread
+
+    ``write`` hands blocks to a bounded queue, so encoding overlaps with
+    rendering while memory stays flat. The format follows the file
+    extension (see OUTPUT_FORMATS); ``subtype`` picks e.g. PCM_16 or PCM_24.
+    The audio goes to a hidden temporary file that only replaces
+    ``file_path`` once it is complete, so a crash or an error never leaves a
+    truncated output behind.
+    """
+    def __init__(self, file_path, channels, rate=RealTime.RATE, subtype=None, max_queue=8):
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {extension or file_path}")
+        file_format, default_subtype = OUTPUT_FORMATS[extension]
+
+        self.file_path = file_path
+        self.frames_written = 0
+        self.error = None
+        directory, name = os.path.split(file_path)
+        self._temp_path = os.path.join(directory, f".{name}.{os.getpid()}.part")
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = sf.SoundFile(self._temp_path, mode='w', samplerate=rate, channels=channels,
+                                  format=file_format, subtype=subtype or default_subtype)
+        self._thread = threading.Thread(target=self._run, name="audio-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                block = self._queue.get()
+                if block is None:
+                    break
+                self._file.write(block)
+                self.frames_written += len(block)
+        except Exception as e:
+            self.error = e
+            # Keep draining so the producer never blocks on a dead writer
+            while self._queue.get() is not None:
+                pass
+        finally:
+            self._file.close()
+
+    def write(self, block):
+        """Queue a (frames,) or (frames, channels) block for writing"""
+        if self.error is not None:
+            raise self.error
+        self._queue.put(np.ascontiguousarray(block, dtype=np.float32))
+
+    def _finish(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Flush the queue, move the finished file into place and re-raise any write error"""
+        self._finish()
+        if self.error is not None:
+            self.abort()
+            raise self.error
+        if self._temp_path is not None:
+            os.replace(self._temp_path, self.file_path)
+            self._temp_path = None
+
+    def abort(self):
+        """Stop writing and discard the partial file, leaving any previous output untouched"""
+        self._finish()
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+def save_audio(audio_data, file_path, callback=None, subtype=None, block_size=65536, task=None):
     """
     Save processed audio to a file
     """
@@ -128,7 +743,11 @@ def save_audio(audio_data, file_path, callback=None):
             callback("Saving audio file...")
             
         # Write to file
-        sf.write(file_path, audio_data, RealTime.RATE)
+        channels = RealTime.as_channels(audio_data).shape[1]
+        with _stage(task, 'write', len(audio_data)):
+            with AudioWriter(file_path, channels, RealTime.RATE, subtype=subtype) as writer:
+                for start in range(0, len(audio_data), block_size):
+                    writer.write(audio_data[start:start + block_size])
         
         if callback:
             callback(f"File saved: {file_path}")
@@ -147,8 +766,8 @@ def get_audio_info(file_path):
         # Load audio file metadata
         info = sf.info(file_path)
         
-        # Get additional info with librosa
-        audio_data, sample_rate = librosa.load(file_path, sr=None)
+        # Get additional info from the (cached) mono decode at the native rate
+        audio_data = RealTime.as_channels(AudioCache.load(file_path, None)).mean(axis=1)
         
         return {
             'duration': info.duration,
@@ -170,8 +789,9 @@ def get_pitch_detection(file_path):
     Detect the pitch of an audio file
     """
     try:
-        # Load audio
-        audio_data, sample_rate = librosa.load(file_path, sr=RealTime.RATE)
+        # Load audio (shares the cached decode with process_audio) as mono
+        audio_data = RealTime.as_channels(load_audio(file_path)).mean(axis=1)
+        sample_rate = RealTime.RATE
         
         # Calculate pitch using librosa
         pitches, magnitudes = librosa.piptrack(y=audio_data, sr=sample_rate)
@@ -194,53 +814,191 @@ def get_pitch_detection(file_path):
         print(f"Error detecting pitch: {e}")
         return 0
 
+def measure_loudness(file_path, audio_data, settings, workers=1, callback=None, task=None,
+                     gate=None, pool=None):
+    """
+    Integrated loudness of a render before the limiter, in LUFS
+
+    ``settings`` are the render settings of ``batch_process``; results are
+    cached per input file and settings, so a re-render skips this pass.
+    """
+    key = Loudness.measurement_key(file_path, settings)
+    loudness = Loudness.cached(key)
+    if loudness is not None:
+        return loudness
+
+    if callback:
+        callback(f"Measuring loudness: {os.path.basename(file_path)}")
+    chunks = _stitch_chunks(audio_data, settings['pitch_shift'], settings['echo'],
+                            settings['reverb'], settings['low_cut'], settings['high_cut'],
+                            workers, 5.0, settings['tone'], task, gate, pool)
+    chunks = _timed(chunks, task, 'render')
+    with _stage(task, 'loudness', len(audio_data)):
+        loudness = Loudness.measure(chunk * settings['volume'] for chunk in chunks)
+    Loudness.store(key, loudness)
+    return loudness
+
 def batch_process(file_list, output_dir, pitch_shift=0, volume=1.0, echo=0, reverb=0, 
-                  gate_threshold=0.1, low_cut=True, high_cut=True, callback=None):
+                  gate_threshold=0.1, low_cut=True, high_cut=True, noise_reduction=False,
+                  workers=1, output_format=None, subtype=None, callback=None, tone=None,
+                  target_lufs=None, task=None, force=False):
     """
     Process multiple audio files with the same settings
+
+    Each file is rendered chunk by chunk and encoded on a writer thread as
+    it goes. ``output_format`` (e.g. '.flac') overrides the input's extension.
+    With ``target_lufs`` every output is normalized to that integrated
+    loudness (see ``measure_loudness``). Pass an AudioProcessingTask as
+    ``task`` to collect the stage profile of the whole batch, with a
+    breakdown per file.
+
+    A manifest in ``output_dir`` records the content hash, settings and
+    code version behind each output, and is updated after every file. A
+    re-run (or a resumed, interrupted one) only renders inputs that are new
+    or changed; ``force`` renders everything again.
     """
     successful_files = []
     
     # Create output directory if it doesn't exist
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+
+    # Everything that changes the output, as it reads back from JSON
+    settings = dict(pitch_shift=pitch_shift, volume=volume, echo=echo, reverb=reverb,
+                    gate_threshold=gate_threshold, low_cut=low_cut, high_cut=high_cut,
+                    noise_reduction=noise_reduction, tone=tone)
+    output_settings = json.loads(json.dumps(dict(settings, target_lufs=target_lufs,
+                                                 subtype=subtype)))
+    manifest = Manifest.load(output_dir)
     
     total_files = len(file_list)
-    for i, file_path in enumerate(file_list):
-        file_name = os.path.basename(file_path)
-        output_file = os.path.join(output_dir, f"processed_{file_name}")
+    # One pool for the whole batch: spawning the workers takes seconds
+    pool = render_pool(workers) if workers > 1 else None
+    try:
+        for i, file_path in enumerate(file_list):
+            file_name = os.path.basename(file_path)
+            base_name, extension = os.path.splitext(file_name)
+            extension = (output_format or extension).lower()
+            if extension not in OUTPUT_FORMATS:
+                extension = '.wav'
+            output_name = f"processed_{base_name}{extension}"
+            output_file = os.path.join(output_dir, output_name)
+
+            # Skip inputs whose output is already up to date
+            try:
+                digest = Manifest.content_hash(file_path, manifest.get(output_name))
+            except OSError as e:
+                if callback:
+                    callback(f"Error processing {file_name}: {e}")
+                continue
+            if not force and Manifest.is_current(manifest.get(output_name), digest,
+                                                 output_settings, output_file):
+                successful_files.append(output_file)
+                if callback:
+                    callback(f"Up to date {i+1}/{total_files}: {file_name}")
+                continue
         
-        if callback:
-            callback(f"Processing file {i+1}/{total_files}: {file_name}")
-            
-        try:
-            # Process the file
-            audio_data = process_audio(
-                file_path,
-                pitch_shift=pitch_shift,
-                volume=volume,
-                echo=echo,
-                reverb=reverb,
-                gate_threshold=gate_threshold,
-                low_cut=low_cut,
-                high_cut=high_cut
-            )
+            if callback:
+                callback(f"Processing file {i+1}/{total_files}: {file_name}")
             
-            # Save the processed file
-            sf.write(output_file, audio_data, RealTime.RATE)
+            # Profile each file separately, sharing the batch task's instruments
+            file_task = None
+            if task is not None:
+                file_task = AudioProcessingTask(track_memory=task.track_memory)
+                file_task.profiler = task.profiler
+
+            try:
+                # Render the file and encode each chunk while the next one renders
+                # Gate each chunk as it renders rather than copying the whole file first
+                audio_data, gate = open_audio(file_path, gate_threshold, noise_reduction, file_task)
+                channels = RealTime.as_channels(audio_data).shape[1]
+
+                # Measure first (unless cached), then apply the gain while writing
+                gain = 1.0
+                if target_lufs is not None:
+                    loudness = measure_loudness(file_path, audio_data, settings, workers, callback,
+                                                file_task, gate, pool)
+                    gain = Loudness.gain_for(loudness, target_lufs)
+
+                with AudioWriter(output_file, channels, RealTime.RATE, subtype=subtype) as writer:
+                    for chunk in render_chunks(
+                        audio_data,
+                        pitch_shift=pitch_shift,
+                        volume=volume * gain,
+                        echo=echo,
+                        reverb=reverb,
+                        low_cut=low_cut,
+                        high_cut=high_cut,
+                        workers=workers,
+                        tone=tone,
+                        task=file_task,
+                        gate=gate,
+                        pool=pool
+                    ):
+                        with _stage(file_task, 'write', len(chunk)):
+                            writer.write(chunk)
+                    # Closing waits for the encoder to catch up
+                    with _stage(file_task, 'write'):
+                        writer.close()
             
-            successful_files.append(output_file)
+                successful_files.append(output_file)
+
+                # Record the output right away so an interrupted batch resumes after it
+                manifest[output_name] = Manifest.make_entry(file_path, digest, output_settings)
+                try:
+                    Manifest.save(output_dir, manifest)
+                except OSError as e:
+                    if callback:
+                        callback(f"Could not update the manifest: {e}")
             
-            if callback:
-                callback(f"Successfully processed: {file_name}")
+                if callback:
+                    callback(f"Successfully processed: {file_name}")
                 
-        except Exception as e:
-            if callback:
-                callback(f"Error processing {file_name}: {e}")
-    
+            except Exception as e:
+                if callback:
+                    callback(f"Error processing {file_name}: {e}")
+
+            if task is not None:
+                task.merge(file_task, label=file_name)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
     return successful_files
 
+def check_seams(seconds=20.0, pitch_shift=3, chunk_seconds=5.0, window=0.5):
+    """
+    Compare the level of ``render_chunks`` with the serial render around
+    every chunk seam and print the largest difference in dB
+    """
+    rate = RealTime.RATE
+    t = np.arange(int(seconds * rate)) / rate
+    audio = (0.2 * np.sin(2 * np.pi * 220 * t) + 0.1 * np.sin(2 * np.pi * 660 * t)).astype(np.float32)
+
+    # The serial path of process_audio, without echo and reverb
+    serial = RealTime.apply_filter(audio, RealTime.init_filter())
+    serial = RealTime.limit(RealTime.pitch_shift(serial, rate, pitch_shift))
+    chunked = np.concatenate(list(render_chunks(audio, pitch_shift, chunk_seconds=chunk_seconds)))
+
+    def level(audio_data, start):
+        block = audio_data[max(start, 0):start + int(window * rate)]
+        return 10 * np.log10(np.mean(block ** 2) + 1e-12)
+
+    # Windows just before, across and just after each seam
+    half = int(window * rate) // 2
+    worst = 0.0
+    for seam in range(int(chunk_seconds * rate), len(audio), int(chunk_seconds * rate)):
+        for start in (seam - 2 * half, seam - half, seam):
+            worst = max(worst, abs(level(chunked, start) - level(serial, start)))
+    print(f"seams: largest level difference {worst:.3f} dB, "
+          f"max sample difference {np.max(np.abs(chunked - serial)):.1e}")
+    return worst
+
 if __name__ == "__main__":
+    if sys.argv[1:] == ["--check-seams"]:
+        check_seams()
+        sys.exit()
+
     # Example usage
     def print_progress(message):
         print(message)
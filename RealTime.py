@@ -1,5 +1,10 @@
+import os
+import re
+import sys
+import time
 import numpy as np
 import scipy.signal as signal
+from scipy.ndimage import maximum_filter1d
 from scipy.io import wavfile
 import librosa
 import librosa.effects
@@ -9,118 +14,751 @@ import soundfile as sf
 RATE = 44100  # Sample rate
 CHUNK = 1024  # Buffer size
 
-def init_filter():
-    """Initialize filters for low and high cut"""
-    filters = {
-        'low_cut': {
-            'b': signal.firwin(101, 300, fs=RATE, pass_zero=False),
-            'a': 1,
-        },
-        'high_cut': {
-            'b': signal.firwin(101, 3000, fs=RATE),
-            'a': 1,
-        }
-    }
-    return filters
+# Echo and reverb timing
+ECHO_DELAY = 0.2  # seconds
+REVERB_DELAY = 0.1  # seconds between reflections
+REVERB_TAPS = 4  # number of reflections
+
+# Where learned noise profiles are kept, one file per input device
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".chameleon", "noise_profiles")
+
+# Tone controls: (kind, center frequency Hz, Q) of the bass, mid and treble bands
+TONE_BANDS = {
+    'bass': ('lowshelf', 150.0, 0.707),
+    'mid': ('peak', 1500.0, 1.0),
+    'treble': ('highshelf', 5000.0, 0.707),
+}
+
+# Params that shape the EQ, in the order ``init_filter`` takes them
+TONE_PARAMS = ('low_cut_freq', 'high_cut_freq', 'bass', 'mid', 'treble')
+
+# Filter designs and windows shared by every chain in the process
+DESIGN_CACHE_SIZE = 256
+_designs = {}
+
+def shared_design(key, design):
+    """
+    Compute ``design()`` once per ``key`` and share the result
+
+    Chains running side by side (e.g. several sessions with the same
+    settings) then reuse one set of coefficients. Callers must not modify
+    the array (it is not flagged read-only because scipy's sosfilt wants a
+    writable ``sos``).
+    """
+    result = _designs.get(key)
+    if result is None:
+        if len(_designs) >= DESIGN_CACHE_SIZE:
+            _designs.clear()
+        result = design()
+        _designs[key] = result
+    return result
+
+class EQBand:
+    """
+    One EQ band: 'lowcut', 'highcut', 'lowshelf', 'highshelf' or 'peak'
+
+    Cuts are Butterworth filters of ``order`` (12 dB/octave per 2), shelves
+    and peaks are the usual cookbook biquads.
+    """
+    def __init__(self, kind, freq, gain_db=0.0, q=0.707, order=2, enabled=True):
+        self.kind = kind
+        self.freq = freq
+        self.gain_db = gain_db
+        self.q = q
+        self.order = order
+        self.enabled = enabled
+
+    @property
+    def active(self):
+        """Flat shelves and peaks are left out of the cascade"""
+        return self.enabled and (self.kind in ('lowcut', 'highcut') or self.gain_db != 0)
+
+    def sos(self, rate):
+        """Second-order sections of the band"""
+        freq = min(max(self.freq, 1.0), 0.49 * rate)
+        if self.kind in ('lowcut', 'highcut'):
+            btype = 'highpass' if self.kind == 'lowcut' else 'lowpass'
+            return signal.butter(self.order, freq, btype=btype, fs=rate, output='sos')
+
+        A = 10.0 ** (self.gain_db / 40.0)
+        w0 = 2 * np.pi * freq / rate
+        cos = np.cos(w0)
+        alpha = np.sin(w0) / (2 * self.q)
+        if self.kind == 'peak':
+            b = [1 + alpha * A, -2 * cos, 1 - alpha * A]
+            a = [1 + alpha / A, -2 * cos, 1 - alpha / A]
+        elif self.kind == 'lowshelf':
+            root = 2 * np.sqrt(A) * alpha
+            b = [A * ((A + 1) - (A - 1) * cos + root), 2 * A * ((A - 1) - (A + 1) * cos),
+                 A * ((A + 1) - (A - 1) * cos - root)]
+            a = [(A + 1) + (A - 1) * cos + root, -2 * ((A - 1) + (A + 1) * cos),
+                 (A + 1) + (A - 1) * cos - root]
+        elif self.kind == 'highshelf':
+            root = 2 * np.sqrt(A) * alpha
+            b = [A * ((A + 1) + (A - 1) * cos + root), -2 * A * ((A - 1) + (A + 1) * cos),
+                 A * ((A + 1) + (A - 1) * cos - root)]
+            a = [(A + 1) - (A - 1) * cos + root, 2 * ((A - 1) - (A + 1) * cos),
+                 (A + 1) - (A - 1) * cos - root]
+        else:
+            raise ValueError(f"Unknown EQ band type: {self.kind}")
+        return np.concatenate((b, a))[None] / a[0]
+
+class ParametricEQ:
+    """
+    N-band parametric EQ run as a single cascade of biquad sections
+
+    Bands are addressed by name. Coefficients are recomputed only after a
+    band actually changes, and ``process`` keeps the filter state across
+    blocks.
+    """
+    def __init__(self, bands, rate=RATE):
+        self.bands = dict(bands)
+        self.rate = rate
+        self._sos = None
+        self._zi = None
+
+    def set_band(self, name, **changes):
+        """Change a band's settings, redesigning the cascade only if needed"""
+        band = self.bands[name]
+        for key, value in changes.items():
+            if getattr(band, key) != value:
+                setattr(band, key, value)
+                self._sos = None
+
+    def update(self, params):
+        """Follow the cut and tone settings of an effect params dict"""
+        self.set_band('low_cut', enabled=bool(params['low_cut']), freq=params['low_cut_freq'])
+        self.set_band('high_cut', enabled=bool(params['high_cut']), freq=params['high_cut_freq'])
+        for name in TONE_BANDS:
+            self.set_band(name, gain_db=params[name])
+
+    @property
+    def sos(self):
+        """Second-order sections of all active bands, shape (sections, 6)"""
+        if self._sos is None:
+            active = [band for band in self.bands.values() if band.active]
+            key = ('eq', self.rate) + tuple((band.kind, band.freq, band.gain_db, band.q, band.order)
+                                            for band in active)
+            self._sos = shared_design(key, lambda: np.concatenate(
+                [band.sos(self.rate) for band in active]) if active else np.zeros((0, 6)))
+        return self._sos
+
+    def reset(self):
+        """Clear the filter state"""
+        self._zi = None
+
+    def process(self, audio_data):
+        """Filter one block, continuing from the previous one"""
+        sos = self.sos
+        if len(sos) == 0:
+            return audio_data
+        block = as_channels(audio_data)
+        # Keep the state through coefficient changes so slider moves don't click
+        if self._zi is None or self._zi.shape != (len(sos), 2, block.shape[1]):
+            self._zi = np.zeros((len(sos), 2, block.shape[1]))
+        filtered, self._zi = signal.sosfilt(sos, block, axis=0, zi=self._zi)
+        return filtered.reshape(np.shape(audio_data))
+
+    def filter(self, audio_data):
+        """Filter a whole recording from silence, leaving the stream state alone"""
+        sos = self.sos
+        if len(sos) == 0:
+            return np.array(audio_data, copy=True)
+        return signal.sosfilt(sos, audio_data, axis=0)
+
+def init_filter(low_cut_freq=100.0, high_cut_freq=8000.0, bass=0.0, mid=0.0, treble=0.0,
+                rate=RATE):
+    """Initialize the EQ: low and high cut plus bass, mid and treble"""
+    tone = {'bass': bass, 'mid': mid, 'treble': treble}
+    bands = {'low_cut': EQBand('lowcut', low_cut_freq)}
+    for name, (kind, freq, q) in TONE_BANDS.items():
+        bands[name] = EQBand(kind, freq, tone[name], q)
+    bands['high_cut'] = EQBand('highcut', high_cut_freq)
+    return ParametricEQ(bands, rate)
+
+def as_channels(audio_data):
+    """Return a ``(frames, channels)`` view of mono or multi-channel audio"""
+    return audio_data.reshape(len(audio_data), -1)
+
+def match_channels(audio_data, channels):
+    """
+    Map ``(frames, channels)`` audio onto a different number of output channels
+    """
+    audio_data = as_channels(audio_data)
+    if audio_data.shape[1] == channels:
+        return audio_data
+    if audio_data.shape[1] == 1:
+        # Duplicate mono into every output channel
+        return np.broadcast_to(audio_data, (len(audio_data), channels))
+    if channels == 1:
+        # Downmix to mono
+        return audio_data.mean(axis=1, keepdims=True)
+    # Wrap around the available channels
+    return audio_data[:, np.arange(channels) % audio_data.shape[1]]
+
+def gate_levels(audio_data, threshold, block_size=65536):
+    """
+    Per-channel levels below which ``noise_gate`` silences samples
+
+    The threshold is relative to each channel's peak, which is found block
+    by block, so a memory-mapped recording is never copied as a whole.
+    """
+    peak = np.zeros(np.shape(audio_data)[1:])
+    for start in range(0, len(audio_data), block_size):
+        peak = np.maximum(peak, np.max(np.abs(audio_data[start:start + block_size]), axis=0))
+    return np.where(peak > 0, threshold * peak, threshold)
+
+def apply_gate(audio_data, levels):
+    """Silence the samples below ``levels`` (see ``gate_levels``)"""
+    gated_data = np.array(audio_data, copy=True)
+    gated_data[np.abs(audio_data) < levels] = 0
+    return gated_data
 
 def noise_gate(audio_data, threshold):
     """
     Apply a noise gate to the audio to remove background noise
     """
-    # Calculate the absolute values
-    abs_data = np.abs(audio_data)
-    
-    # Calculate the RMS (root mean square) level
-    rms = np.sqrt(np.mean(abs_data**2))
-    
-    # Normalize the threshold against the maximum possible amplitude
-    normalized_threshold = threshold * np.max(abs_data) if np.max(abs_data) > 0 else threshold
-    
-    # Create a mask for values below the threshold
-    mask = abs_data < normalized_threshold
-    
-    # Apply the gate
-    gated_data = audio_data.copy()
-    gated_data[mask] = 0
-    
-    return gated_data
+    return apply_gate(audio_data, gate_levels(audio_data, threshold))
 
-def apply_filter(audio_data, filters, use_low_cut=True, use_high_cut=True):
+class VoiceActivityDetector:
     """
-    Apply low-cut and high-cut filters to the audio
+    Streaming voice activity detector
+
+    A block is speech when its level clears a tracked noise floor by
+    ``margin_db`` and its zero-crossing rate is speech-like (very loud
+    blocks pass regardless, to keep fricatives). After the last speech
+    block the decision is held for ``hangover`` seconds so word endings and
+    short pauses are not cut. The floor starts at ``min_level_db`` and never
+    goes below it, so neither the first block nor digital silence (e.g. a
+    warm-up block) can set it to the level of whatever is playing.
     """
-    filtered_data = audio_data.copy()
-    
-    # Apply low-cut filter (removes low frequencies)
-    if use_low_cut:
-        filtered_data = signal.lfilter(
-            filters['low_cut']['b'],
-            filters['low_cut']['a'],
-            filtered_data
-        )
-    
-    # Apply high-cut filter (removes high frequencies)
-    if use_high_cut:
-        filtered_data = signal.lfilter(
-            filters['high_cut']['b'],
-            filters['high_cut']['a'],
-            filtered_data
+    def __init__(self, rate=RATE, margin_db=9.0, max_zcr=0.25, hangover=0.3,
+                 min_level_db=-70.0, floor_rise=3.0):
+        self.rate = rate
+        self.margin_db = margin_db
+        self.max_zcr = max_zcr
+        self.hangover = hangover
+        self.min_level_db = min_level_db
+        self.floor_rise = floor_rise  # dB per second the floor may creep up
+        self.reset()
+
+    def reset(self):
+        self.noise_floor = self.min_level_db
+        self.is_speech = False
+        self._hold = 0.0
+
+    @staticmethod
+    def features(frames):
+        """Level in dBFS and zero-crossing rate of (n, frame, channels) frames"""
+        mono = frames.mean(axis=-1)
+        level = 10 * np.log10(np.mean(mono ** 2, axis=-1) + 1e-12)
+        zcr = np.mean(np.signbit(mono[:, 1:]) != np.signbit(mono[:, :-1]), axis=-1)
+        return level, zcr
+
+    def decide(self, level, zcr, floor):
+        """Raw speech decision, before the hangover"""
+        loud = level > np.maximum(floor + self.margin_db, self.min_level_db)
+        return loud & ((zcr < self.max_zcr) | (level > floor + 2 * self.margin_db))
+
+    def process(self, audio_data):
+        """Classify one block; returns True while speech (or its hangover) lasts"""
+        block = as_channels(audio_data)
+        if len(block) < 2:
+            return self.is_speech
+        level, zcr = self.features(block[None])
+        level, zcr = float(level[0]), float(zcr[0])
+        seconds = len(block) / self.rate
+
+        # The floor follows quieter blocks at once and louder ones slowly
+        if level < self.noise_floor:
+            self.noise_floor = max(level, self.min_level_db)
+        else:
+            self.noise_floor = min(level, self.noise_floor + self.floor_rise * seconds)
+
+        if self.decide(level, zcr, self.noise_floor):
+            self._hold = self.hangover
+        else:
+            self._hold -= seconds
+        self.is_speech = self._hold > 0
+        return self.is_speech
+
+def speech_mask(audio_data, rate=RATE, frame=CHUNK, detector=None):
+    """
+    Speech decision per ``frame`` samples of a whole recording, vectorized;
+    the noise floor is the 10th percentile of the frame levels
+    """
+    detector = detector or VoiceActivityDetector(rate)
+    data = as_channels(audio_data)
+    count = len(data) // frame
+    if count == 0:
+        return np.ones(1, dtype=bool)
+    frames = np.asarray(data[:count * frame]).reshape(count, frame, data.shape[1])
+    level, zcr = detector.features(frames)
+    speech = detector.decide(level, zcr, np.percentile(level, 10))
+
+    # Hangover: a frame stays speech for a while after the last speech frame
+    hold = int(np.ceil(detector.hangover * rate / frame))
+    speech = np.convolve(speech, np.ones(hold + 1), mode='full')[:count] > 0
+    if len(data) > count * frame:
+        speech = np.append(speech, speech[-1])
+    return speech
+
+def speech_regions(audio_data, rate=RATE, min_silence=1.0, pre_roll=0.2, frame=CHUNK):
+    """
+    (start, end) sample ranges around speech, leaving out silent stretches
+    of at least ``min_silence`` seconds; each range starts ``pre_roll``
+    seconds early so onsets are kept
+    """
+    speech = speech_mask(audio_data, rate, frame)
+    min_frames = int(np.ceil(min_silence * rate / frame))
+    pad = int(pre_roll * rate)
+
+    regions = []
+    start = None
+    silent = 0
+    for i, active in enumerate(speech):
+        if active:
+            if start is None:
+                start = i
+            silent = 0
+        elif start is not None:
+            silent += 1
+            if silent >= min_frames:
+                regions.append((start, i - silent + 1))
+                start = None
+    if start is not None:
+        regions.append((start, len(speech)))
+    return [(max(0, s * frame - pad), min(len(audio_data), e * frame)) for s, e in regions]
+
+def _profile_path(device_name):
+    """Return the noise profile file used for an input device"""
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(device_name)).strip('_')
+    return os.path.join(PROFILE_DIR, f"{safe_name or 'default'}.npy")
+
+class SpectralStage:
+    """
+    Streaming STFT shared by a list of spectral operations
+
+    Each block is transformed once, every enabled operation in ``ops`` edits
+    the same complex frames in place through ``process_spectrum(spec)``
+    (``spec`` is shaped (frames, channels, bins)), and the result is
+    inverted once. Output is delayed by a fixed ``latency`` of ``n_fft``
+    samples.
+    """
+    def __init__(self, ops=(), rate=RATE, n_fft=1024, hop=256):
+        self.ops = list(ops)
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop
+        self.bins = n_fft // 2 + 1
+        self.latency = n_fft
+
+        # sqrt-Hann analysis and synthesis windows give perfect reconstruction
+        self.window = shared_design(('sqrt_hann', n_fft), lambda: np.sqrt(np.hanning(n_fft + 1)[:-1]))
+        self._synthesis_window = shared_design(
+            ('synthesis', n_fft, hop), lambda: self.window / (np.sum(self.window ** 2) / hop))
+
+        self._capacity = 0
+        self.reset()
+
+    def reset(self):
+        """Clear the streaming buffers and the state of every operation"""
+        self._channels = None
+        for op in self.ops:
+            op.reset()
+
+    def _init_buffers(self, channels):
+        """Allocate the streaming buffers for a given channel count"""
+        # Leading zeros let the first samples see the same window overlap as the rest
+        self._channels = channels
+        self._in_buf = np.zeros((self.n_fft - self.hop, channels), dtype=np.float32)
+        self._ola = np.zeros((self.n_fft - self.hop, channels))
+        self._out_buf = np.zeros((self.latency - (self.n_fft - self.hop), channels), dtype=np.float32)
+        self._capacity = 0
+
+    def _workspace(self, n_frames):
+        """Preallocated frame arrays, grown only when a longer block arrives"""
+        if n_frames > self._capacity:
+            self._capacity = n_frames
+            self._windowed = np.empty((n_frames, self._channels, self.n_fft))
+            self._spec = np.empty((n_frames, self._channels, self.bins), dtype=np.complex128)
+            self._out_frames = np.empty((n_frames, self._channels, self.n_fft))
+            self._acc = np.empty(((n_frames - 1) * self.hop + self.n_fft, self._channels))
+        return (self._windowed[:n_frames], self._spec[:n_frames],
+                self._out_frames[:n_frames], self._acc[:(n_frames - 1) * self.hop + self.n_fft])
+
+    def frames(self, data):
+        """View ``(samples, channels)`` data as ``(frames, channels, n_fft)``"""
+        if len(data) < self.n_fft:
+            return np.zeros((0, data.shape[1], self.n_fft), dtype=data.dtype)
+        n_frames = (len(data) - self.n_fft) // self.hop + 1
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.n_fft, axis=0)
+        return windows[::self.hop][:n_frames]
+
+    def analyze(self, audio_data):
+        """Spectrum of a whole recording, without touching the stream"""
+        frames = self.frames(as_channels(np.asarray(audio_data, dtype=np.float32)))
+        return np.fft.rfft(frames * self.window, axis=-1)
+
+    def process(self, audio_data):
+        """
+        Run one block through every enabled operation; same length and shape out
+        """
+        block = as_channels(np.asarray(audio_data, dtype=np.float32))
+        if self._channels != block.shape[1]:
+            self._init_buffers(block.shape[1])
+        data = np.concatenate((self._in_buf, block))
+        frames = self.frames(data)
+        n_frames = len(frames)
+
+        if n_frames:
+            windowed, spec, out_frames, acc = self._workspace(n_frames)
+            np.multiply(frames, self.window, out=windowed)
+            np.fft.rfft(windowed, axis=-1, out=spec)
+
+            for op in self.ops:
+                if op.enabled:
+                    op.process_spectrum(spec)
+
+            np.fft.irfft(spec, n=self.n_fft, axis=-1, out=out_frames)
+            out_frames *= self._synthesis_window
+
+            # Overlap-add all frames at once, one hop-sized slice per overlap
+            acc.fill(0)
+            acc[:len(self._ola)] += self._ola
+            for r in range(self.n_fft // self.hop):
+                piece = out_frames[:, :, r * self.hop:(r + 1) * self.hop].transpose(0, 2, 1)
+                acc[r * self.hop:r * self.hop + n_frames * self.hop] += piece.reshape(-1, self._channels)
+
+            emitted = n_frames * self.hop
+            self._ola = acc[emitted:].copy()
+            self._out_buf = np.concatenate((self._out_buf, acc[:emitted].astype(np.float32)))
+            data = data[emitted:]
+
+        self._in_buf = data
+        output = self._out_buf[:len(block)]
+        self._out_buf = self._out_buf[len(block):]
+        return output.reshape(np.shape(audio_data))
+
+class SpectralNoiseReducer:
+    """
+    Spectral gate: Wiener-style spectral subtraction of a learned noise profile
+
+    The noise power spectrum is learned from the first ``learn_seconds`` of
+    audio and afterwards keeps adapting on frames quiet enough to be noise
+    only. Works as an operation inside a SpectralStage, or on its own
+    through ``process``.
+    """
+    def __init__(self, rate=RATE, n_fft=1024, hop=256, strength=1.5, floor=0.1,
+                 learn_seconds=1.0, adapt=True, noise_margin=2.0, smoothing=0.6):
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop
+        self.strength = strength
+        self.floor = floor
+        self.adapt = adapt
+        self.noise_margin = noise_margin
+        self.smoothing = smoothing
+        self.enabled = True
+
+        self.noise_profile = None
+        self._learn_target = max(1, int(learn_seconds * rate / hop))
+        self._learn_sum = np.zeros(n_fft // 2 + 1)
+        self._learn_count = 0
+        self._stage = None
+        self.reset()
+
+    def reset(self):
+        """Clear the gain smoothing (the learned profile is kept)"""
+        self._gain_zi = None
+
+    @property
+    def stage(self):
+        """Private stage used when the reducer runs on its own"""
+        if self._stage is None:
+            self._stage = SpectralStage([self], self.rate, self.n_fft, self.hop)
+        return self._stage
+
+    @property
+    def latency(self):
+        return self.stage.latency
+
+    @property
+    def is_learning(self):
+        return self.noise_profile is None
+
+    def learn(self, audio_data):
+        """Learn the noise profile from a stretch of noise-only audio"""
+        spec = self.stage.analyze(audio_data)
+        if len(spec) == 0:
+            return
+        self.noise_profile = (np.abs(spec) ** 2).mean(axis=(0, 1))
+
+    def save_profile(self, device_name):
+        """Persist the learned noise profile for an input device"""
+        if self.noise_profile is None:
+            return False
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        np.save(_profile_path(device_name), self.noise_profile)
+        return True
+
+    def load_profile(self, device_name):
+        """Load a previously saved noise profile for an input device"""
+        path = _profile_path(device_name)
+        if not os.path.exists(path):
+            return False
+        profile = np.load(path)
+        if profile.shape != (self.n_fft // 2 + 1,):
+            return False
+        self.noise_profile = profile
+        return True
+
+    def _gains(self, power):
+        """Compute the suppression gain for every frame, channel and bin"""
+        gains = np.ones_like(power)
+
+        # Accumulate the startup noise estimate, passing audio through meanwhile
+        start = 0
+        if self.is_learning:
+            start = min(len(power), self._learn_target - self._learn_count)
+            self._learn_sum += power[:start].mean(axis=1).sum(axis=0)
+            self._learn_count += start
+            if self._learn_count >= self._learn_target:
+                self.noise_profile = self._learn_sum / self._learn_count
+            else:
+                return gains
+
+        power = power[start:]
+        if len(power) == 0:
+            return gains
+
+        # Keep tracking the noise floor on frames that look noise-only
+        if self.adapt:
+            frame_power = power.mean(axis=1).sum(axis=-1)
+            quiet = frame_power < self.noise_margin * self.noise_profile.sum()
+            if np.any(quiet):
+                weight = self.smoothing ** np.count_nonzero(quiet)
+                self.noise_profile = (weight * self.noise_profile
+                                      + (1 - weight) * power[quiet].mean(axis=(0, 1)))
+
+        # Wiener-style gain with a floor to avoid musical noise
+        raw = np.maximum(1.0 - self.strength * self.noise_profile / (power + 1e-12), self.floor)
+
+        # Smooth the gains over time with a one-pole filter across frames
+        if self._gain_zi is None or self._gain_zi.shape[1:] != raw.shape[1:]:
+            self._gain_zi = raw[:1] * self.smoothing
+        smoothed, self._gain_zi = signal.lfilter(
+            [1 - self.smoothing], [1, -self.smoothing], raw, axis=0, zi=self._gain_zi
         )
-    
-    return filtered_data
+        gains[start:] = smoothed
+        return gains
+
+    def process_spectrum(self, spec):
+        """Attenuate the noise in a (frames, channels, bins) spectrum in place"""
+        spec *= self._gains(spec.real ** 2 + spec.imag ** 2)
 
-def pitch_shift(audio_data, sample_rate, n_steps):
+    def process(self, audio_data):
+        """
+        Denoise one block on the reducer's own stage
+        """
+        return self.stage.process(audio_data)
+
+class PhaseVocoderShift:
+    """
+    Pitch shift inside the STFT: each output bin takes the magnitude of the
+    bin 1/ratio below it, and phases are propagated from the measured
+    instantaneous frequencies so partials stay continuous between frames
+    """
+    def __init__(self, n_fft=1024, hop=256, n_steps=0.0):
+        self.n_fft = n_fft
+        self.hop = hop
+        self.bins = n_fft // 2 + 1
+        # Phase advance per hop of each bin's center frequency
+        self._expected = 2 * np.pi * hop * np.arange(self.bins) / n_fft
+        self._n_steps = 0.0
+        self.reset()
+        self.n_steps = n_steps
+
+    @property
+    def n_steps(self):
+        return self._n_steps
+
+    @n_steps.setter
+    def n_steps(self, value):
+        # Phases tracked before a bypass are stale once it ends
+        if self._n_steps == 0 and value != 0:
+            self.reset()
+        if value != self._n_steps:
+            ratio = 2.0 ** (value / 12.0)
+            position = np.arange(self.bins) / ratio
+            self._valid = position <= self.bins - 1
+            self._source = np.minimum(np.round(position).astype(int), self.bins - 1)
+            # Magnitudes are interpolated between the two nearest source bins
+            self._lower = np.minimum(np.floor(position).astype(int), self.bins - 2)
+            self._frac = np.clip(position - self._lower, 0.0, 1.0)
+            self._recenter = np.pi * (self._source - np.arange(self.bins))
+            self._ratio = ratio
+        self._n_steps = value
+
+    @property
+    def enabled(self):
+        return self._n_steps != 0
+
+    def reset(self):
+        """Forget the phase history"""
+        self._last_phase = None
+        self._synth_phase = None
+
+    def process_spectrum(self, spec):
+        """Shift a (frames, channels, bins) spectrum in place"""
+        magnitude = np.abs(spec)
+        phase = np.angle(spec)
+
+        # Measured phase advance of every analysis bin, frame to frame
+        if self._last_phase is None or self._last_phase.shape != phase.shape[1:]:
+            self._last_phase = phase[0] - self._expected
+        previous = np.concatenate((self._last_phase[None], phase[:-1]))
+        deviation = phase - previous - self._expected
+        deviation = (deviation + np.pi) % (2 * np.pi) - np.pi
+        advance = (self._expected + deviation)[..., self._source] * self._ratio
+
+        # Accumulate the synthesis phases along the frames in one go
+        if self._synth_phase is None or self._synth_phase.shape != phase.shape[1:]:
+            # Keep each frame centered: undo the source bin's linear phase, apply the target's
+            self._synth_phase = phase[0][..., self._source] + self._recenter - advance[0]
+        synth_phase = self._synth_phase + np.cumsum(advance, axis=0)
+
+        self._last_phase = phase[-1]
+        self._synth_phase = np.mod(synth_phase[-1], 2 * np.pi)
+        shifted = (magnitude[..., self._lower] * (1 - self._frac)
+                   + magnitude[..., self._lower + 1] * self._frac) * self._valid
+
+        # Stretching or squeezing the spectrum changes each frame's energy; put it back
+        energy = np.sum(magnitude ** 2, axis=-1, keepdims=True)
+        shifted_energy = np.sum(shifted ** 2, axis=-1, keepdims=True)
+        shifted *= np.minimum(np.sqrt(energy / (shifted_energy + 1e-12)), 4.0)
+        spec[:] = shifted * np.exp(1j * synth_phase)
+
+class SpectralEQ:
+    """
+    Smooth EQ curve applied directly to the spectrum
+    """
+    def __init__(self, rate=RATE, n_fft=1024, points=None):
+        self.freqs = np.fft.rfftfreq(n_fft, 1.0 / rate)
+        self.set_curve(points or [])
+
+    def set_curve(self, points):
+        """
+        Set the curve from (frequency Hz, gain dB) points, interpolated on a log axis
+        """
+        self.points = sorted(points)
+        self.enabled = bool(self.points)
+        if not self.enabled:
+            self.gains = np.ones_like(self.freqs)
+            return
+        log_freqs = np.log10(np.maximum(self.freqs, 1.0))
+        point_freqs = np.log10([max(f, 1.0) for f, _ in self.points])
+        gains_db = np.interp(log_freqs, point_freqs, [g for _, g in self.points])
+        self.gains = 10.0 ** (gains_db / 20.0)
+
+    def reset(self):
+        pass
+
+    def process_spectrum(self, spec):
+        """Apply the curve to a (frames, channels, bins) spectrum in place"""
+        spec *= self.gains
+
+def apply_spectral(audio_data, stage, block_size=65536):
+    """
+    Run a whole recording through a SpectralStage in large batches of frames,
+    compensating the stage latency
+    """
+    padding = np.zeros((stage.latency,) + audio_data.shape[1:], dtype=np.float32)
+    padded = np.concatenate((audio_data, padding))
+    output = np.concatenate([
+        stage.process(padded[i:i + block_size])
+        for i in range(0, len(padded), block_size)
+    ])
+    return output[stage.latency:stage.latency + len(audio_data)]
+
+def reduce_noise(audio_data, rate=RATE, learn_seconds=0.5, strength=1.5, floor=0.1,
+                 block_size=65536):
+    """
+    Denoise a whole recording in large vectorized batches of frames
+    """
+    reducer = SpectralNoiseReducer(rate, strength=strength, floor=floor,
+                                   learn_seconds=learn_seconds)
+
+    # Learn from the start of the file up front so every frame is treated alike
+    reducer.learn(audio_data[:int(learn_seconds * rate)])
+    return apply_spectral(audio_data, reducer.stage, block_size)
+
+def apply_filter(audio_data, filters, use_low_cut=True, use_high_cut=True):
+    """
+    Apply the EQ from ``init_filter`` to a whole recording
+    """
+    # Toggle the low-cut and high-cut bands
+    filters.set_band('low_cut', enabled=use_low_cut)
+    filters.set_band('high_cut', enabled=use_high_cut)
+    return filters.filter(audio_data)
+
+def pitch_stream(chunks, sample_rate, n_steps, n_fft=2048, hop=512):
+    """
+    Pitch shift an iterable of chunks in order, yielding output aligned with
+    the input (the STFT latency is compensated and flushed at the end)
+
+    The phase vocoder's phases carry over from one chunk to the next, so
+    however a recording is cut into chunks the result has no seams and
+    matches a whole-file shift.
+    """
+    stage = SpectralStage([PhaseVocoderShift(n_fft, hop, n_steps)], sample_rate, n_fft, hop)
+    skip = stage.latency
+    shape = None
+    for chunk in chunks:
+        shape = np.shape(chunk)[1:]
+        output = stage.process(chunk)
+        if skip:
+            dropped = min(skip, len(output))
+            output = output[dropped:]
+            skip -= dropped
+        if len(output):
+            yield output
+    if shape is not None:
+        tail = stage.process(np.zeros((stage.latency,) + shape, dtype=np.float32))[skip:]
+        yield tail
+
+def pitch_shift(audio_data, sample_rate, n_steps, block_size=65536):
     """
     Shift the pitch of the audio
+
+    A whole-file run of ``pitch_stream``, fed in blocks so the STFT
+    workspace stays small, so chunked renders sound exactly the same.
     """
-    # Using librosa for pitch shifting
-    # Convert to float32 if not already
-    audio_float = audio_data.astype(np.float32)
-    
-    # Check if audio is too short for default n_fft
-    if len(audio_float) < 2048:
-        # Use a smaller n_fft value
-        n_fft = 1024
-        while n_fft > len(audio_float) and n_fft > 64:
-            n_fft = n_fft // 2
-        
-        # Apply pitch shift with custom n_fft
-        shifted = librosa.effects.pitch_shift(
-            y=audio_float,
-            sr=sample_rate,
-            n_steps=n_steps,
-            bins_per_octave=12,
-            n_fft=n_fft
-        )
-    else:
-        # Apply standard pitch shift
-        shifted = librosa.effects.pitch_shift(
-            y=audio_float,
-            sr=sample_rate,
-            n_steps=n_steps,
-            bins_per_octave=12
-        )
-    
-    return shifted
+    blocks = (audio_data[i:i + block_size] for i in range(0, len(audio_data), block_size))
+    shifted = list(pitch_stream(blocks, sample_rate, n_steps))
+    if not shifted:
+        return np.array(audio_data, dtype=np.float32, copy=True)
+    return np.concatenate(shifted)
 
-def add_echo(audio_data, echo_strength):
+def add_echo(audio_data, echo_strength, normalize=False):
     # Calculate delay samples (about 200ms)
-    delay_samples = int(RATE * 0.2)
+    delay_samples = int(RATE * ECHO_DELAY)
     
     # Calculate decay factor based on echo strength
     decay = 0.5 * echo_strength
     
     # Create a delayed version of the audio
     if len(audio_data) > delay_samples:
-        # Create padded arrays
-        original = np.pad(audio_data, (0, delay_samples), 'constant')
-        delayed = np.pad(audio_data, (delay_samples, 0), 'constant')
+        # Create padded arrays (time runs along the first axis)
+        extra_axes = [(0, 0)] * (audio_data.ndim - 1)
+        original = np.pad(audio_data, [(0, delay_samples)] + extra_axes, 'constant')
+        delayed = np.pad(audio_data, [(delay_samples, 0)] + extra_axes, 'constant')
         
         # Mix original and delayed signals
         result = original + delayed * decay
         
         # Normalize to prevent clipping
-        if np.max(np.abs(result)) > 0:
+        if normalize and np.max(np.abs(result)) > 0:
             result = result / np.max(np.abs(result))
         
         # Return the part that matches the original length
@@ -128,18 +766,18 @@ def add_echo(audio_data, echo_strength):
     else:
         return audio_data
 
-def add_reverb(audio_data, reverb_amount):
+def add_reverb(audio_data, reverb_amount, normalize=False):
     """
     Add a simple reverb effect to audio data
     """
     # Determine delay in samples (e.g., 100ms at 44.1kHz)
-    delay_samples = int(0.1 * 44100)
+    delay_samples = int(REVERB_DELAY * RATE)
     
     # Create output array (same length as input)
     output = np.copy(audio_data)
     
     # Create a few delays with decreasing amplitude
-    for i in range(1, 5):
+    for i in range(1, REVERB_TAPS + 1):
         # Calculate delay position and amplitude
         delay_pos = i * delay_samples
         amplitude = reverb_amount * (0.7 ** i)  # Exponential decay
@@ -151,7 +789,7 @@ def add_reverb(audio_data, reverb_amount):
             output[delay_pos:] += audio_data[:max_copy] * amplitude
     
     # Normalize if needed to prevent clipping
-    if np.max(np.abs(output)) > 1.0:
+    if normalize and np.max(np.abs(output)) > 1.0:
         output = output / np.max(np.abs(output))
         
     return output
@@ -162,6 +800,367 @@ def apply_volume(audio_data, volume):
     """
     return audio_data * volume
 
+class MultiTapDelay:
+    """
+    Feed-forward delay line with several taps that keeps its history across
+    blocks, so echoes and reflections carry over block boundaries
+    """
+    def __init__(self, delays, rate=RATE):
+        self.delays = [int(delay * rate) for delay in delays]
+        self.length = max(self.delays)
+        self.reset()
+
+    def reset(self):
+        """Forget the delayed signal"""
+        self._history = None
+
+    def process(self, audio_data, gains):
+        """Add each tap, scaled by its gain in ``gains``, to one block"""
+        block = as_channels(audio_data)
+        if self._history is None or self._history.shape[1] != block.shape[1]:
+            self._history = np.zeros((self.length, block.shape[1]), dtype=np.float32)
+        data = np.concatenate((self._history, block))
+
+        output = block.astype(np.float64)
+        for delay, gain in zip(self.delays, gains):
+            if gain:
+                output += gain * data[self.length - delay:self.length - delay + len(block)]
+
+        self._history = data[len(data) - self.length:]
+        return output.reshape(np.shape(audio_data))
+
+def echo_delay(rate=RATE):
+    """Streaming counterpart of ``add_echo``"""
+    return MultiTapDelay([ECHO_DELAY], rate)
+
+def echo_gains(echo_strength):
+    return [0.5 * echo_strength]
+
+def reverb_delay(rate=RATE):
+    """Streaming counterpart of ``add_reverb``"""
+    return MultiTapDelay([i * REVERB_DELAY for i in range(1, REVERB_TAPS + 1)], rate)
+
+def reverb_gains(reverb_amount):
+    return [reverb_amount * (0.7 ** i) for i in range(1, REVERB_TAPS + 1)]
+
+# The limiter's sample-recursive release: compiled with numba when it is
+# available (librosa depends on it), otherwise it falls back to NumPy
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKEND = 'numba' if numba is not None else 'numpy'
+
+def _jit(function):
+    if numba is None:
+        return None
+    return numba.njit(cache=True, nogil=True)(function)
+
+def _use_jit(backend):
+    backend = backend or BACKEND
+    if backend not in ('numba', 'numpy'):
+        raise ValueError(f"Unknown backend: {backend}")
+    return backend == 'numba' and numba is not None
+
+def _decay_hold_loop(x, state, step):
+    """Follow rises at once, fall by ``step`` per sample"""
+    out = np.empty_like(x)
+    env = state
+    for n in range(x.shape[0]):
+        env = max(x[n], env - step)
+        out[n] = env
+    return out
+
+_decay_hold_kernel = _jit(_decay_hold_loop)
+
+def decay_hold(x, state, step, backend=None):
+    """``out[n] = max(x[n], out[n-1] - step)``, starting from ``state``"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    if _use_jit(backend):
+        return _decay_hold_kernel(x, float(state), float(step))
+    ramp = step * np.arange(len(x))
+    out = np.maximum.accumulate(x + ramp) - ramp
+    return np.maximum(out, state - step * np.arange(1, len(x) + 1))
+
+def warm_up():
+    """
+    Compile the kernel for the argument types used at runtime, so the
+    first audio callback does not stall on compilation
+    """
+    if numba is None:
+        return False
+    _decay_hold_kernel(np.zeros(CHUNK), 0.0, 0.5)
+    return True
+
+def benchmark_kernels(seconds=5.0, blocksize=CHUNK, channels=2):
+    """Time the limiter per block with both backends and print the results"""
+    audio = np.random.default_rng(0).standard_normal((int(seconds * RATE), channels)) * 0.1
+    blocks = [audio[i:i + blocksize] for i in range(0, len(audio) - blocksize + 1, blocksize)]
+    processors = {
+        'limiter': lambda backend: Limiter(backend=backend).process,
+    }
+    warm_up()
+    results = {}
+    for name, make in processors.items():
+        timings = {}
+        outputs = {}
+        for backend in ('numba', 'numpy'):
+            if backend == 'numba' and numba is None:
+                continue
+            process = make(backend)
+            started = time.perf_counter()
+            outputs[backend] = np.concatenate([process(block) for block in blocks])
+            timings[backend] = 1000.0 * (time.perf_counter() - started) / len(blocks)
+        results[name] = timings
+        line = "  ".join(f"{backend} {ms:.3f} ms" for backend, ms in timings.items())
+        if len(outputs) == 2:
+            line += f"  (max difference {np.max(np.abs(outputs['numba'] - outputs['numpy'])):.1e})"
+        print(f"{name:18s} {line}")
+    return results
+
+class Limiter:
+    """
+    Look-ahead peak limiter with an optional compressor in front
+
+    The signal is delayed by ``lookahead`` seconds so the gain can ramp down
+    before a peak arrives; no output sample exceeds ``ceiling``. The gain
+    recovers by 20 dB per ``release`` seconds. With ``ratio`` > 1 levels
+    above ``threshold_db`` are also compressed. All state is kept across
+    blocks, so gain stays smooth from one block to the next and nothing
+    needs the whole signal.
+    """
+    def __init__(self, rate=RATE, ceiling=0.99, lookahead=0.005, release=0.1,
+                 threshold_db=-12.0, ratio=1.0, detector=0.01, backend=None):
+        self.rate = rate
+        self.backend = backend
+        self.ceiling = ceiling
+        self.latency = max(1, int(lookahead * rate))
+        self.release_step = 20.0 / (release * rate)  # dB per sample
+        self.threshold_db = threshold_db
+        self.ratio = ratio
+        self._smoothing = np.exp(-1.0 / (detector * rate))
+        self.reset()
+
+    def reset(self):
+        """Clear the delay line and the gain history"""
+        self._channels = None
+
+    def _init_state(self, channels):
+        L = self.latency
+        self._channels = channels
+        self._delay = np.zeros((L, channels), dtype=np.float32)
+        self._reduction = np.zeros(L)  # last required reductions, for the hold
+        self._envelope = 0.0           # released reduction after the last sample
+        self._ramp = np.zeros(L - 1)   # last released reductions, for the ramp
+        self._level_zi = np.zeros(1)
+
+    def _required(self, block):
+        """Gain reduction in dB each input sample needs"""
+        peak = np.max(np.abs(block), axis=1).astype(np.float64)
+        reduction = np.maximum(20 * np.log10(np.maximum(peak, 1e-12) / self.ceiling), 0.0)
+
+        if self.ratio > 1:
+            # Compress on a smoothed power envelope
+            a = self._smoothing
+            power, self._level_zi = signal.lfilter([1 - a], [1, -a], peak ** 2, zi=self._level_zi)
+            over = 10 * np.log10(np.maximum(power, 1e-24)) - self.threshold_db
+            reduction = np.maximum(reduction, np.maximum(over, 0.0) * (1 - 1 / self.ratio))
+        return reduction
+
+    def process(self, audio_data):
+        """Limit one block; the output lags the input by ``latency`` samples"""
+        block = as_channels(audio_data)
+        if self._channels != block.shape[1]:
+            self._init_state(block.shape[1])
+        L = self.latency
+        n = len(block)
+        if n == 0:
+            return np.array(audio_data, dtype=np.float32)
+
+        # Hold every reduction for the look-ahead so it covers the peak's arrival
+        reduction = np.concatenate((self._reduction, self._required(block)))
+        held = maximum_filter1d(reduction, L + 1)[(L + 1) // 2:(L + 1) // 2 + n]
+        self._reduction = reduction[n:]
+
+        # Release: reductions fall back at release_step dB per sample
+        released = decay_hold(held, self._envelope, self.release_step, self.backend)
+        self._envelope = released[-1]
+
+        # Ramp the gain in over the look-ahead with a moving average
+        extended = np.concatenate((self._ramp, released))
+        sums = np.cumsum(np.concatenate(([0.0], extended)))
+        smoothed = (sums[L:] - sums[:-L]) / L
+        self._ramp = extended[len(extended) - (L - 1):]
+
+        # Delay the audio by the look-ahead and apply the gain
+        delayed = np.concatenate((self._delay, block))
+        self._delay = delayed[n:]
+        output = delayed[:n] * (10.0 ** (-smoothed / 20.0))[:, None]
+        return output.astype(np.float32).reshape(np.shape(audio_data))
+
+    def flush(self):
+        """Return the audio still held in the look-ahead delay"""
+        if self._channels is None:
+            return np.zeros((0, 1), dtype=np.float32)
+        return self.process(np.zeros((self.latency, self._channels), dtype=np.float32))
+
+def limit_stream(chunks, limiter=None):
+    """
+    Run an iterable of chunks through a limiter, yielding output aligned with
+    the input (the look-ahead delay is compensated and flushed at the end)
+    """
+    limiter = limiter or Limiter()
+    skip = limiter.latency
+    shape = None
+    for chunk in chunks:
+        shape = np.shape(chunk)[1:]
+        output = limiter.process(chunk)
+        if skip:
+            dropped = min(skip, len(output))
+            output = output[dropped:]
+            skip -= dropped
+        if len(output):
+            yield output
+    if shape is not None:
+        tail = limiter.flush()[skip:]
+        yield tail.reshape((-1,) + shape)
+
+def limit(audio_data, limiter=None):
+    """Limit a whole recording in one streaming pass"""
+    return np.concatenate(list(limit_stream([audio_data], limiter)))
+
+# Settings read by EffectChain, as set by the GUI sliders and switches
+DEFAULT_PARAMS = {
+    'pitch': 0.0,
+    'volume': 0.7,
+    'echo': 0.0,
+    'reverb': 0.0,
+    'gate_threshold': 0.2,
+    'low_cut': True,
+    'high_cut': True,
+    'noise_reduction': False,
+    'low_cut_freq': 100.0,
+    'high_cut_freq': 8000.0,
+    'bass': 0.0,
+    'mid': 0.0,
+    'treble': 0.0,
+    'vad': False,
+}
+
+class EffectChain:
+    """
+    Stateful realtime effect chain
+
+    Holds everything that has to survive from one block to the next, so the
+    same chain can run inside the audio callback or on a separate DSP thread.
+    """
+    def __init__(self, rate=RATE):
+        self.rate = rate
+        self.filters = init_filter()
+
+        # Denoising, pitch shift and the EQ curve share one STFT per block
+        self.noise_reducer = SpectralNoiseReducer(rate)
+        self.pitch_shifter = PhaseVocoderShift(self.noise_reducer.n_fft, self.noise_reducer.hop)
+        self.eq = SpectralEQ(rate, self.noise_reducer.n_fft)
+        self.spectral = SpectralStage([self.noise_reducer, self.pitch_shifter, self.eq],
+                                      rate, self.noise_reducer.n_fft, self.noise_reducer.hop)
+        self._spectral_active = False
+
+        self.echo = echo_delay(rate)
+        self.reverb = reverb_delay(rate)
+        self.limiter = Limiter(rate, lookahead=0.002)
+
+        # Voice activity: silent blocks skip the stages before the delay lines
+        # once their buffered output (the tail) has been played out
+        self.vad = VoiceActivityDetector(rate)
+        self.tail_frames = self.spectral.latency + int(0.05 * rate)
+        self._quiet_frames = 0
+        self._bypassing = False
+        self.blocks = 0
+        self.bypassed = 0
+        self.process_seconds = 0.0
+        self.bypass_seconds = 0.0
+
+    def process(self, audio_data, params):
+        """
+        Run one (frames, channels) block through the chain
+        """
+        started = time.perf_counter()
+        frames = len(audio_data)
+
+        # Silence stays silence; keep learning the noise profile though
+        learning = params['noise_reduction'] and self.noise_reducer.is_learning
+        if not params['vad'] or learning or self.vad.process(audio_data):
+            self._quiet_frames = 0
+        else:
+            audio_data = np.zeros_like(audio_data)
+            self._quiet_frames += frames
+        bypass = self._quiet_frames > self.tail_frames
+
+        if not bypass:
+            if self._bypassing:
+                # The stages hold only silence now; restart the pitch shifter's phases cleanly
+                self.spectral.reset()
+            audio_data = self._process_voice(audio_data, params)
+        self._bypassing = bypass
+
+        # Apply echo and reverb; the delay lines carry their tails between blocks
+        audio_data = self.echo.process(audio_data, echo_gains(params['echo']))
+        audio_data = self.reverb.process(audio_data, reverb_gains(params['reverb']))
+
+        # Apply volume, then keep the peaks in range without per-block normalization
+        output = self.limiter.process(audio_data[:frames] * params['volume'])
+
+        elapsed = time.perf_counter() - started
+        self.blocks += 1
+        if bypass:
+            self.bypassed += 1
+            self.bypass_seconds += elapsed
+        else:
+            self.process_seconds += elapsed
+        return output
+
+    def _process_voice(self, audio_data, params):
+        """The stages skipped on silence: spectral stage, gate and EQ"""
+        # Apply the spectral stage (noise reduction, pitch shift, EQ curve)
+        self.noise_reducer.enabled = params['noise_reduction']
+        self.pitch_shifter.n_steps = params['pitch']
+        active = any(op.enabled for op in self.spectral.ops)
+        if active:
+            if not self._spectral_active:
+                # Buffered audio from before the bypass would replay stale
+                self.spectral.reset()
+            audio_data = self.spectral.process(audio_data)
+        self._spectral_active = active
+
+        # Apply noise gate
+        audio_data = noise_gate(audio_data, params['gate_threshold'])
+
+        # Apply the EQ (cuts and tone bands in one biquad cascade)
+        self.filters.update(params)
+        return self.filters.process(audio_data)
+
+    @property
+    def latency(self):
+        """Frames the chain currently delays its input by"""
+        return self.limiter.latency + (self.spectral.latency if self._spectral_active else 0)
+
+    def vad_stats(self):
+        """How many blocks the VAD bypassed and the processing time that saved"""
+        processed = self.blocks - self.bypassed
+        full_cost = self.process_seconds / processed if processed else 0.0
+        bypass_cost = self.bypass_seconds / self.bypassed if self.bypassed else 0.0
+        saved = max(0.0, full_cost - bypass_cost) * self.bypassed
+        spent = self.process_seconds + self.bypass_seconds
+        return {
+            'blocks': self.blocks,
+            'bypassed': self.bypassed,
+            'bypassed_fraction': self.bypassed / self.blocks if self.blocks else 0.0,
+            'saved_ms': 1000.0 * saved,
+            'saved_fraction': saved / (spent + saved) if spent + saved else 0.0,
+        }
+
 def process_audio(audio_data, pitch_shift_value=0, volume=1.0, echo=0, reverb=0, 
                   gate_threshold=0.1, low_cut=True, high_cut=True):
     """
@@ -191,7 +1190,8 @@ def process_audio(audio_data, pitch_shift_value=0, volume=1.0, echo=0, reverb=0,
     # Apply volume
     processed = apply_volume(processed, volume)
     
-    return processed
+    # Keep the peaks in range
+    return limit(processed)
 
 def save_processed_audio(input_file, output_file, pitch_shift_value=0, volume=1.0, 
                          echo=0, reverb=0, gate_threshold=0.1, low_cut=True, high_cut=True):
@@ -200,7 +1200,8 @@ def save_processed_audio(input_file, output_file, pitch_shift_value=0, volume=1.
     """
     try:
         # Load audio file
-        audio_data, sample_rate = librosa.load(input_file, sr=RATE)
+        audio_data, sample_rate = librosa.load(input_file, sr=RATE, mono=False)
+        audio_data = audio_data.T
         
         # Process audio
         processed = process_audio(
@@ -229,7 +1230,8 @@ def test_processing():
     try:
         # You can replace this with any test WAV file
         test_file = "sample-audio.wav"
-        audio_data, sample_rate = librosa.load(test_file, sr=RATE)
+        audio_data, sample_rate = librosa.load(test_file, sr=RATE, mono=False)
+        audio_data = audio_data.T
         
         # Process with some test settings
         processed = process_audio(
@@ -251,4 +1253,7 @@ def test_processing():
         print(f"Test processing failed: {e}")
 
 if __name__ == "__main__":
-    test_processing()
\ No newline at end of file
+    if sys.argv[1:] == ["--bench"]:
+        benchmark_kernels()
+    else:
+        test_processing()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+import numpy as np
+import soundfile as sf
+
+import RealTime
+import Pipeline
+from PreRec import OUTPUT_FORMATS
+
+# Recordings are written losslessly
+RECORD_FORMATS = ('.wav', '.flac')
+
+class Recorder:
+    """
+    Records the processed realtime output to a WAV or FLAC file
+
+    ``push`` is called from the audio callback: it copies the block into a
+    preallocated lock-free ring and returns at once. A writer thread drains
+    the ring into the file. If the disk stalls long enough for the ring to
+    fill up, whole blocks are dropped and counted rather than ever making
+    the callback wait.
+    """
+    def __init__(self, file_path, channels, rate=RealTime.RATE, subtype=None, buffer_seconds=4.0,
+                 blocksize=RealTime.CHUNK):
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in RECORD_FORMATS:
+            raise ValueError(f"Recordings must be .wav or .flac, not {extension or file_path}")
+        file_format, default_subtype = OUTPUT_FORMATS[extension]
+
+        self.file_path = file_path
+        self.channels = channels
+        self.rate = rate
+        self.ring = Pipeline.RingBuffer(int(buffer_seconds * rate), channels)
+        self.frames_written = 0
+        self.dropped_blocks = 0
+        self.dropped_frames = 0
+        self.error = None
+
+        self._scratch = np.zeros((blocksize * 8, channels), dtype=np.float32)
+        self._idle = blocksize / rate / 2
+        self._file = sf.SoundFile(file_path, mode='w', samplerate=rate, channels=channels,
+                                  format=file_format, subtype=subtype or default_subtype)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def push(self, block):
+        """Queue one (frames, channels) block; never blocks (audio thread)"""
+        if self.ring.space() < len(block):
+            self.dropped_blocks += 1
+            self.dropped_frames += len(block)
+            return False
+        self.ring.write(block)
+        return True
+
+    def _run(self):
+        try:
+            while self._running or self.ring.available():
+                frames = self.ring.read_into(self._scratch)
+                if frames == 0:
+                    time.sleep(self._idle)
+                    continue
+                self._file.write(self._scratch[:frames])
+                self.frames_written += frames
+        except Exception as e:
+            self.error = e
+            # Keep consuming so the ring does not just fill up behind a dead writer
+            while self._running:
+                self.ring.clear()
+                time.sleep(self._idle)
+        finally:
+            self._file.close()
+
+    @property
+    def seconds(self):
+        """Length of the recording so far"""
+        return self.frames_written / self.rate
+
+    def close(self):
+        """Write out what is queued, close the file and re-raise any write error"""
+        if self._thread is not None:
+            self._running = False
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            raise self.error
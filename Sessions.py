@@ -0,0 +1,300 @@
+import sys
+import json
+import time
+import threading
+import numpy as np
+import sounddevice as sd
+
+import RealTime
+import Pipeline
+
+class Session:
+    """
+    One input/output device pair with its own effect chain and settings
+
+    The PortAudio callback only moves blocks through an AudioPipeline; the
+    chain runs on the session's own DSP thread, which also measures the CPU
+    time it spends. ``params`` is replaced as a whole by ``set_params``, so
+    the DSP thread always sees a consistent snapshot.
+    """
+    def __init__(self, name, input_device=None, output_device=None, params=None,
+                 channels_in=None, channels_out=None, blocksize=RealTime.CHUNK, margin_blocks=2,
+                 rate=RealTime.RATE):
+        self.name = name
+        self.input_device = input_device
+        self.output_device = output_device
+        self.params = dict(RealTime.DEFAULT_PARAMS, **(params or {}))
+        self.channels_in = channels_in
+        self.channels_out = channels_out
+        self.blocksize = blocksize
+        self.margin_blocks = margin_blocks
+        self.rate = rate
+
+        self.chain = RealTime.EffectChain(rate)
+        self.pipeline = None
+        self.stream = None
+        self.errors = 0
+        self.last_error = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.blocks = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.max_block_seconds = 0.0
+
+    def set_params(self, **changes):
+        """Change some effect settings of this session only"""
+        self.params = dict(self.params, **changes)
+
+    def process(self, block):
+        """Run one block through the chain, timing it (DSP thread)"""
+        cpu, started = time.thread_time(), time.perf_counter()
+        output = self.chain.process(block, self.params)
+        elapsed = time.perf_counter() - started
+        self.cpu_seconds += time.thread_time() - cpu
+        self.wall_seconds += elapsed
+        self.max_block_seconds = max(self.max_block_seconds, elapsed)
+        self.blocks += 1
+        return output
+
+    def _on_error(self, error):
+        self.errors += 1
+        self.last_error = error
+
+    def _device_channels(self):
+        """Channel counts: as configured, else up to stereo as the devices allow"""
+        channels_in, channels_out = self.channels_in, self.channels_out
+        if channels_in is None:
+            channels_in = min(2, sd.query_devices(self.input_device, 'input')['max_input_channels'])
+        if channels_out is None:
+            channels_out = min(2, sd.query_devices(self.output_device, 'output')['max_output_channels'])
+        return channels_in, channels_out
+
+    def profile_name(self):
+        """Noise profiles are kept per input device"""
+        if self.input_device is None:
+            return "default"
+        return sd.query_devices(self.input_device, 'input')['name']
+
+    def open(self):
+        """Create the pipeline (without a stream, e.g. to drive ``callback`` yourself)"""
+        self.channels_in, self.channels_out = self._device_channels()
+        self._reset_stats()
+        self.pipeline = Pipeline.AudioPipeline(
+            self.process,
+            blocksize=self.blocksize,
+            channels_in=self.channels_in,
+            channels_out=self.channels_out,
+            margin_blocks=self.margin_blocks,
+            rate=self.rate,
+            on_error=self._on_error
+        )
+        self.pipeline.start()
+
+    def start(self):
+        """Open the devices and start processing"""
+        self.chain.noise_reducer.load_profile(self.profile_name())
+        self.open()
+        try:
+            self.stream = sd.Stream(
+                device=(self.input_device, self.output_device),
+                samplerate=self.rate,
+                blocksize=self.blocksize,
+                dtype=np.float32,
+                channels=(self.channels_in, self.channels_out),
+                callback=self.pipeline.callback
+            )
+            self.stream.start()
+        except Exception:
+            self.pipeline.stop()
+            self.pipeline = None
+            raise
+
+    def stop(self):
+        """Stop the stream and the DSP thread, keeping the learned noise profile"""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+            self.chain.noise_reducer.save_profile(self.profile_name())
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def latency_ms(self):
+        """Input to output latency: device buffers, safety margin and the chain's own delay"""
+        latency = self.chain.latency / self.rate
+        if self.pipeline is not None:
+            latency += self.pipeline.latency_ms() / 1000.0
+        if self.stream is not None:
+            latency += sum(self.stream.latency)
+        return 1000.0 * latency
+
+    def stats(self):
+        """CPU use, block timing, dropouts and latency of this session"""
+        audio_seconds = self.blocks * self.blocksize / self.rate
+        pipeline = self.pipeline.stats() if self.pipeline is not None else {}
+        return {
+            'blocks': self.blocks,
+            'cpu_ms': 1000.0 * self.cpu_seconds,
+            'cpu_load': self.cpu_seconds / audio_seconds if audio_seconds else 0.0,
+            'mean_block_ms': 1000.0 * self.wall_seconds / self.blocks if self.blocks else 0.0,
+            'max_block_ms': 1000.0 * self.max_block_seconds,
+            'underruns': pipeline.get('underruns', 0),
+            'overruns': pipeline.get('overruns', 0),
+            'errors': self.errors,
+            'latency_ms': self.latency_ms(),
+        }
+
+class SessionManager:
+    """
+    Runs several independent sessions in one process
+
+    Every session keeps its own chain state and settings, while the
+    imports, the compiled kernels and the filter designs
+    (``RealTime.shared_design``) are shared between them.
+    """
+    def __init__(self, blocksize=RealTime.CHUNK, margin_blocks=2, rate=RealTime.RATE):
+        self.blocksize = blocksize
+        self.margin_blocks = margin_blocks
+        self.rate = rate
+        self.sessions = {}
+        self.running = False
+        self._started = None
+
+    def add(self, name, input_device=None, output_device=None, params=None, **options):
+        """Add a session; it starts right away if the manager is running"""
+        if name in self.sessions:
+            raise ValueError(f"Session already exists: {name}")
+        options = dict(dict(blocksize=self.blocksize, margin_blocks=self.margin_blocks,
+                            rate=self.rate), **options)
+        session = Session(name, input_device, output_device, params, **options)
+        if self.running:
+            session.start()
+        self.sessions[name] = session
+        return session
+
+    def remove(self, name):
+        """Stop a session and forget it"""
+        session = self.sessions.pop(name)
+        session.stop()
+        return session
+
+    def set_params(self, name, **changes):
+        """Change the settings of one session"""
+        self.sessions[name].set_params(**changes)
+
+    def start(self):
+        """Start every session; if one fails the others are stopped again"""
+        # Compile the kernels once for everybody before the first callback
+        RealTime.warm_up()
+        started = []
+        try:
+            for session in self.sessions.values():
+                session.start()
+                started.append(session)
+        except Exception:
+            for session in started:
+                session.stop()
+            raise
+        self.running = True
+        self._started = time.process_time(), time.perf_counter()
+
+    def stop(self):
+        """Stop every session"""
+        for session in self.sessions.values():
+            session.stop()
+        self.running = False
+
+    def stats(self):
+        """Per-session stats plus the CPU load of the whole process"""
+        stats = {name: session.stats() for name, session in self.sessions.items()}
+        if self._started is not None:
+            cpu, wall = self._started
+            elapsed = time.perf_counter() - wall
+            stats['process_cpu_load'] = (time.process_time() - cpu) / elapsed if elapsed else 0.0
+        return stats
+
+def load_test(sessions=3, seconds=5.0, blocksize=RealTime.CHUNK, channels=2, params=None):
+    """
+    Drive ``sessions`` sessions in real time without audio hardware
+
+    One thread per session plays the PortAudio callback on a steady clock,
+    feeding speech-like noise bursts, and the stats show whether the DSP
+    threads kept up.
+    """
+    manager = SessionManager(blocksize=blocksize)
+    for i in range(sessions):
+        session = manager.add(f"voice{i + 1}", params=dict(params or {}, pitch=i + 1),
+                              channels_in=channels, channels_out=channels)
+        session.open()
+    RealTime.warm_up()
+    manager._started = time.process_time(), time.perf_counter()
+
+    period = blocksize / RealTime.RATE
+    rng = np.random.default_rng(0)
+    # Alternate a second of noise with a second of near silence, like speech with pauses
+    voice = rng.standard_normal((int(seconds * RealTime.RATE), channels)).astype(np.float32) * 0.1
+    voice[(np.arange(len(voice)) // RealTime.RATE) % 2 == 1] *= 0.001
+
+    def play(session):
+        outdata = np.zeros((blocksize, channels), dtype=np.float32)
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(voice) - blocksize + 1, blocksize)):
+            delay = start + i * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            session.pipeline.callback(voice[offset:offset + blocksize], outdata, blocksize,
+                                      None, None)
+
+    threads = [threading.Thread(target=play, args=(session,), daemon=True)
+               for session in manager.sessions.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = manager.stats()
+    for session in manager.sessions.values():
+        session.pipeline.stop()
+    return stats
+
+def run(config_path):
+    """
+    Run the sessions listed in a JSON file until interrupted
+
+    The file holds a list of {"name", "input", "output", "params"} objects;
+    devices are sounddevice indices or names.
+    """
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    manager = SessionManager()
+    for entry in config:
+        manager.add(entry['name'], entry.get('input'), entry.get('output'), entry.get('params'))
+    manager.start()
+    print(f"[INFO] Running {len(manager.sessions)} sessions, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5.0)
+            print_stats(manager.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        print_stats(manager.stats())
+
+def print_stats(stats):
+    for name, session in stats.items():
+        if name == 'process_cpu_load':
+            print(f"[INFO] process: CPU {session:.0%}")
+            continue
+        print(f"[INFO] {name}: CPU {session['cpu_load']:.1%}, block {session['mean_block_ms']:.2f} ms "
+              f"(max {session['max_block_ms']:.1f}), latency {session['latency_ms']:.0f} ms, "
+              f"underruns {session['underruns']}, errors {session['errors']}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "--test":
+        run(sys.argv[1])
+    else:
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        print_stats(load_test(count))
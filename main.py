@@ -1,4 +1,5 @@
 import os
+import threading
 import numpy as np
 import tkinter as tk
 import sounddevice as sd
@@ -9,6 +10,19 @@ from tkinter import filedialog
 import RealTime
 from ConsoleLog import ConsoleLogging
 import PreRec
+import Pipeline
+import Playback
+import NetAudio
+import Recorder
+
+# save dialog entries: (label, pattern, soundfile subtype)
+SAVE_TYPES = [
+    ("WAV 32-bit float", "*.wav", "FLOAT"),
+    ("WAV 24-bit", "*.wav", "PCM_24"),
+    ("WAV 16-bit", "*.wav", "PCM_16"),
+    ("FLAC", "*.flac", None),
+    ("OGG Vorbis", "*.ogg", None),
+]
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
@@ -18,7 +32,7 @@ class App(ctk.CTk):
         super().__init__()
 
         self.title("Chameleon VoicMod")
-        self.geometry(f"{400}x{750}")
+        self.geometry(f"{400}x{950}")
         self.resizable(False, False)
         
         # input and output device list
@@ -88,6 +102,26 @@ class App(ctk.CTk):
             )
         self.high_cut_filter.grid(row=1, column=1, pady=(10, 0), padx=20, sticky="e")
 
+        # spectral noise reduction (learns the background noise per input device)
+        self.noise_reduction_var = ctk.BooleanVar(value=False)
+        self.noise_reduction_switch = ctk.CTkSwitch(
+            master=self.mode_filter_frame,
+            text="Noise reduction",
+            variable=self.noise_reduction_var
+            )
+        self.noise_reduction_switch.grid(row=2, column=1, pady=(10, 0), padx=20, sticky="e")
+
+        # live preview loops a few seconds around the playhead with the current settings
+        self.preview_var = ctk.BooleanVar(value=False)
+        self.preview_switch = ctk.CTkSwitch(
+            master=self.mode_filter_frame,
+            text="Live preview",
+            variable=self.preview_var,
+            command=self.toggle_preview,
+            state="disabled"
+            )
+        self.preview_switch.grid(row=2, column=0, pady=(10, 0), padx=20, sticky="w")
+
         # prerecord audio file upload button
         self.upload_audio_button = ctk.CTkButton(
             master=self.mode_filter_frame,
@@ -95,8 +129,102 @@ class App(ctk.CTk):
             text="Upload Audio File",
             state="disabled",
             )
-        self.upload_audio_button.grid(row=2, column=0, columnspan=2, pady=(20, 10), padx=10, sticky="ew")
+        self.upload_audio_button.grid(row=3, column=0, columnspan=2, pady=(20, 10), padx=10, sticky="ew")
         
+        # realtime engine options
+        self.options_frame = ctk.CTkFrame(self.main_frame)
+        self.options_frame.grid(row=2, column=0, padx=5, pady=5, sticky="ew")
+        self.options_frame.grid_columnconfigure(0, weight=1)
+        self.options_frame.grid_columnconfigure(1, weight=1)
+
+        # buffered mode runs the effects on a DSP thread behind ring buffers
+        self.pipeline_var = ctk.BooleanVar(value=False)
+        self.pipeline_switch = ctk.CTkSwitch(
+            master=self.options_frame,
+            text="Buffered DSP",
+            variable=self.pipeline_var
+            )
+        self.pipeline_switch.grid(row=0, column=0, pady=(10, 0), padx=20, sticky="w")
+
+        self.margin_menu = ctk.CTkOptionMenu(
+            master=self.options_frame,
+            values=["1 block", "2 blocks", "3 blocks", "4 blocks"],
+            width=110
+            )
+        self.margin_menu.grid(row=0, column=1, pady=(10, 0), padx=20, sticky="e")
+        self.margin_menu.set("2 blocks")
+
+        # worker process keeps the effects away from GUI activity entirely
+        self.worker_var = ctk.BooleanVar(value=False)
+        self.worker_switch = ctk.CTkSwitch(
+            master=self.options_frame,
+            text="Worker process",
+            variable=self.worker_var
+            )
+        self.worker_switch.grid(row=1, column=0, pady=(10, 0), padx=20, sticky="w")
+
+        # voice activity detection skips the heavy effects on silent blocks
+        self.vad_var = ctk.BooleanVar(value=RealTime.DEFAULT_PARAMS['vad'])
+        self.vad_switch = ctk.CTkSwitch(
+            master=self.options_frame,
+            text="Skip silence",
+            variable=self.vad_var
+            )
+        self.vad_switch.grid(row=1, column=1, pady=(10, 0), padx=20, sticky="e")
+
+        # network output also sends the processed audio to another program
+        self.net_var = ctk.BooleanVar(value=False)
+        self.net_switch = ctk.CTkSwitch(
+            master=self.options_frame,
+            text="Network out",
+            variable=self.net_var
+            )
+        self.net_switch.grid(row=2, column=0, pady=(10, 0), padx=20, sticky="w")
+
+        self.net_address = ctk.CTkEntry(master=self.options_frame, width=140)
+        self.net_address.grid(row=2, column=1, pady=(10, 0), padx=20, sticky="e")
+        self.net_address.insert(0, f"udp://{NetAudio.HOST}:{NetAudio.PORT}")
+
+        # record what the voice changer plays to a WAV or FLAC file
+        self.record_var = ctk.BooleanVar(value=False)
+        self.record_switch = ctk.CTkSwitch(
+            master=self.options_frame,
+            text="Record output",
+            variable=self.record_var,
+            command=self.toggle_record
+            )
+        self.record_switch.grid(row=3, column=0, pady=(10, 0), padx=20, sticky="w")
+
+        self.status_label = ctk.CTkLabel(self.options_frame, text="")
+        self.status_label.grid(row=9, column=0, columnspan=2, pady=(0, 5), padx=20, sticky="w")
+
+        # EQ: adjustable cut frequencies and bass/mid/treble gains
+        self.eq_frame = ctk.CTkFrame(self.main_frame)
+        self.eq_frame.grid(row=3, column=0, padx=5, pady=5, sticky="ew")
+
+        self.eq_sliders = {}
+        eq_ranges = [
+            ('low_cut_freq', "Low Cut", 20, 500),
+            ('bass', "Bass", -12, 12),
+            ('mid', "Mid", -12, 12),
+            ('treble', "Treble", -12, 12),
+            ('high_cut_freq', "High Cut", 2000, 16000),
+        ]
+        for column, (key, text, low, high) in enumerate(eq_ranges):
+            self.eq_frame.grid_columnconfigure(column, weight=1)
+            slider = ctk.CTkSlider(
+                master=self.eq_frame,
+                from_=low,
+                to=high,
+                orientation="vertical",
+                height=100
+            )
+            slider.grid(row=0, column=column, pady=(10, 0), padx=5)
+            slider.set(RealTime.DEFAULT_PARAMS[key])
+            label = ctk.CTkLabel(self.eq_frame, text=text)
+            label.grid(row=1, column=column, pady=(0, 5), padx=5)
+            self.eq_sliders[key] = slider
+
         self.slider_frame = ctk.CTkFrame(self.main_frame)
         self.slider_frame.grid(row=6, column=0, pady=(10,10), padx=(10,10), sticky="ew")
 
@@ -192,6 +320,7 @@ class App(ctk.CTk):
         )
         self.media_progress_bar.grid(row=8, column=0, columnspan=2, pady=10, padx=(50,70), sticky="ew")
         self.media_progress_bar.set(0)
+        self.media_progress_bar.bind("<Button-1>", self.seek_media)
 
         self.save_audio = ctk.CTkButton(
             master=self.main_frame,
@@ -222,12 +351,52 @@ class App(ctk.CTk):
 
         self.is_running = False
         self.stream = None
-        self.filters = RealTime.init_filter()
+        self.chain = RealTime.EffectChain(RealTime.RATE)
+        self.pipeline = None
+        self.pipeline_error = None
+        self.sender = None
+        self.recorder = None
+        self.record_path = None
+        self.channels_out = None
+        self.params = dict(RealTime.DEFAULT_PARAMS)
         self.filename = None
         self.modified_audio = None
+        self.player = None
+        self.preview = None
+        self.render_thread = None
+        self.render_error = None
+        self.render_pool = None
         self.is_playing = False
         self.file_loc = None
 
+        self.poll_params()
+
+        # Compile the DSP kernels now rather than in the first audio callback
+        threading.Thread(target=RealTime.warm_up, name="jit-warm-up", daemon=True).start()
+
+    def read_params(self):
+        """Read the effect settings from the widgets"""
+        return {
+            'pitch': self.pitch.get(),
+            'volume': self.volume.get() / 100.0,
+            'echo': self.echo.get() / 100.0,
+            'reverb': self.reverb.get() / 100.0,
+            'gate_threshold': self.gate_scale.get() / 100.0,
+            'low_cut': self.low_cut_var.get(),
+            'high_cut': self.high_cut_var.get(),
+            'noise_reduction': self.noise_reduction_var.get(),
+            'vad': self.vad_var.get(),
+            **{key: slider.get() for key, slider in self.eq_sliders.items()},
+        }
+
+    def poll_params(self):
+        """Publish a fresh settings snapshot for the audio thread"""
+        # Widgets are only touched here on the Tk thread; the audio side reads the dict
+        self.params = self.read_params()
+        if isinstance(self.pipeline, Pipeline.ProcessPipeline):
+            self.pipeline.set_params(self.params)
+        self.after(50, self.poll_params)
+
     def get_device_id(self, device_string):
         return int(device_string.split(":")[0]) if device_string else None
 
@@ -242,41 +411,11 @@ class App(ctk.CTk):
         
         if self.is_running:
             try:
-                # Get settings
-                pitch_shift_value = self.pitch.get()
-                volume = self.volume.get() / 100.0
-                echo_value = self.echo.get() / 100.0
-                reverb_value = self.reverb.get() / 100.0
-                gate_threshold = self.gate_scale.get() / 100.0
-
-                # Extract audio data from first channel (mono)
-                audio_data = indata[:, 0].copy() if indata.shape[1] > 0 else indata.copy().flatten()
-
-                # Apply noise gate
-                audio_data = RealTime.noise_gate(audio_data, gate_threshold)
-                
-                # Apply filters
-                audio_data = RealTime.apply_filter(audio_data, self.filters, 
-                                                self.low_cut_var.get(), 
-                                                self.high_cut_var.get())
-
-                # Apply pitch shifting
-                shifted_data = RealTime.pitch_shift(audio_data, RealTime.RATE, pitch_shift_value)
+                # Process every input channel at once as (frames, channels)
+                shifted_data = self.chain.process(indata.copy(), self.params)
 
-                # Apply echo if value > 0
-                if echo_value > 0:
-                    shifted_data = RealTime.add_echo(shifted_data, echo_value)
-                
-                # Apply reverb if value > 0
-                if reverb_value > 0:
-                    shifted_data = RealTime.add_reverb(shifted_data, reverb_value)
-
-                # Apply volume
-                shifted_data = shifted_data[:frames] * volume
-
-                # Fill all output channels with the processed audio
-                for channel in range(outdata.shape[1]):
-                    outdata[:, channel] = shifted_data
+                # Map the processed channels onto the output channels
+                outdata[:] = RealTime.match_channels(shifted_data, outdata.shape[1])
 
             except Exception as e:
                 self.logger.log_error(f"[ERR] Error in audio processing: {e}")
@@ -295,6 +434,30 @@ class App(ctk.CTk):
                     self.stream.stop()
                     self.stream.close()
                     self.stream = None
+                # The worker process saves its own noise profile when it exits
+                if not isinstance(self.pipeline, Pipeline.ProcessPipeline):
+                    self.save_noise_profile()
+                    vad = self.chain.vad_stats()
+                    if vad['bypassed']:
+                        self.logger.log_info(f"[INFO] Skip silence: {vad['bypassed_fraction']:.0%} of blocks bypassed, "
+                                             f"{vad['saved_ms']:.0f} ms of processing saved "
+                                             f"({vad['saved_fraction']:.0%})")
+                if self.pipeline:
+                    self.pipeline.stop()
+                    stats = self.pipeline.stats()
+                    self.logger.log_info(f"[INFO] Buffered DSP: {stats['underruns']} underruns, "
+                                         f"peak block time {stats['max_process_ms']:.1f} ms")
+                    self.pipeline = None
+                if self.sender:
+                    self.sender.close()
+                    self.logger.log_info(f"[INFO] Network out: {self.sender.sent} blocks sent, "
+                                         f"{self.sender.dropped} dropped")
+                    if self.sender.error is not None:
+                        self.logger.log_warning(f"[WARN] Network out stopped: {self.sender.error}")
+                    self.sender = None
+                # A finished recording is not resumed into the same file
+                self.stop_recording()
+                self.record_var.set(False)
                 self.is_running = False
                 self.start_button.configure(text="START")
                 self.logger.log_info("[***] Voice Modulation Stopped")
@@ -310,11 +473,55 @@ class App(ctk.CTk):
                     input_channels = devices[input_device_id]['max_input_channels']
                     output_channels = devices[output_device_id]['max_output_channels']
                     
-                    # Use minimum of 1 or available channels (typically we want 1 channel for voice)
-                    channels_in = min(1, input_channels)
+                    # Keep stereo input when the device offers it
+                    channels_in = min(2, input_channels)
                     channels_out = min(2, output_channels)  # Prefer stereo output if available
                     
                     self.logger.log_info(f"[INFO] Using {channels_in} input channels and {channels_out} output channels")
+
+                    self.chain = RealTime.EffectChain(RealTime.RATE)
+                    self.load_noise_profile()
+
+                    # Connect the network output first so a bad address fails before any DSP starts
+                    if self.net_var.get():
+                        self.sender = self.open_sender(self.net_address.get())
+
+                    callback = self.audio_callback
+                    margin_blocks = int(self.margin_menu.get().split()[0])
+                    if self.worker_var.get():
+                        # Run the effect chain in a separate, auto-restarting process
+                        self.pipeline = Pipeline.ProcessPipeline(
+                            self.params,
+                            blocksize=RealTime.CHUNK,
+                            channels_in=channels_in,
+                            channels_out=channels_out,
+                            margin_blocks=margin_blocks,
+                            profile_device=self.get_device_name(self.input_devices.get())
+                        )
+                        self.pipeline.start()
+                        callback = self.pipeline.callback
+                        self.logger.log_info(f"[INFO] DSP worker process with {self.pipeline.latency_ms():.0f} ms safety margin")
+                    elif self.pipeline_var.get():
+                        # Decouple the DSP from the PortAudio callback
+                        self.pipeline = Pipeline.AudioPipeline(
+                            lambda block: self.chain.process(block, self.params),
+                            blocksize=RealTime.CHUNK,
+                            channels_in=channels_in,
+                            channels_out=channels_out,
+                            margin_blocks=margin_blocks,
+                            on_error=self.on_pipeline_error
+                        )
+                        self.pipeline.start()
+                        callback = self.pipeline.callback
+                        self.logger.log_info(f"[INFO] Buffered DSP with {self.pipeline.latency_ms():.0f} ms safety margin")
+
+                    if self.sender:
+                        # Send whatever is played to the network as well
+                        callback = NetAudio.tee_callback(callback, self.sender)
+                        self.logger.log_info(f"[INFO] Network out to {self.net_address.get()}")
+
+                    # Let a recorder (started now or later) see every played block
+                    callback = self.tap_output(callback)
                     
                     self.stream = sd.Stream(
                         device=(input_device_id, output_device_id),
@@ -322,27 +529,143 @@ class App(ctk.CTk):
                         blocksize=RealTime.CHUNK,
                         dtype=np.float32,
                         channels=(channels_in, channels_out),  # Separate channel config for input/output
-                        callback=self.audio_callback
+                        callback=callback
                     )
                     self.stream.start()
+                    self.channels_out = channels_out
                     self.is_running = True
+                    if self.record_var.get():
+                        self.start_recording()
                     self.start_button.configure(text="STOP")
                     self.logger.log_info("[INFO] Audio stream started successfully")
+                    if self.pipeline:
+                        self.after(500, self.pipeline_status)
                 except Exception as e:
                     self.logger.log_error(f"[ERR] Failed to start audio stream: {e}")
+                    # Nothing may keep running without a stream to feed it
+                    if self.stream:
+                        self.stream.close()
+                        self.stream = None
+                    if self.pipeline:
+                        self.pipeline.stop()
+                        self.pipeline = None
+                    if self.sender:
+                        self.sender.close()
+                        self.sender = None
         except Exception as err:
             self.logger.log_error(f"[ERR] Error in start function: {err}")
 
+    def tap_output(self, callback):
+        """Wrap the stream callback so a running recorder gets every played block"""
+        def tap(indata, outdata, frames, time_info, status):
+            callback(indata, outdata, frames, time_info, status)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.push(outdata)
+        return tap
+
+    def toggle_record(self):
+        """Ask for a file when recording is switched on; finish it when switched off"""
+        if not self.record_var.get():
+            self.stop_recording()
+            return
+
+        self.record_path = filedialog.asksaveasfilename(
+            defaultextension=".wav",
+            filetypes=[("WAV", "*.wav"), ("FLAC", "*.flac")]
+        )
+        if not self.record_path:
+            self.record_var.set(False)
+            self.logger.log_warning("[WARN] Recording canceled")
+            return
+        if self.is_running:
+            self.start_recording()
+        else:
+            self.logger.log_info(f"[INFO] Recording will start with the stream: {self.record_path}")
+
+    def start_recording(self):
+        try:
+            self.recorder = Recorder.Recorder(self.record_path, self.channels_out, RealTime.RATE)
+            self.logger.log_info(f"[INFO] Recording to: {self.record_path}")
+        except Exception as e:
+            self.record_var.set(False)
+            self.logger.log_error(f"[ERR] Failed to start recording: {e}")
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return
+        try:
+            recorder.close()
+            self.logger.log_info(f"[SAVE] Recorded {recorder.seconds:.1f} s to: {recorder.file_path}")
+            if recorder.dropped_blocks:
+                self.logger.log_warning(f"[WARN] Recording dropped {recorder.dropped_blocks} blocks "
+                                        f"while the disk was busy")
+        except Exception as e:
+            self.logger.log_error(f"[ERR] Error writing recording: {e}")
+
+    def open_sender(self, address):
+        """Open a NetAudio sender for 'udp://host:port' (or 'tcp://...')"""
+        protocol, _, location = address.rpartition("://")
+        host, _, port = location.rpartition(":")
+        return NetAudio.AudioSender(host or NetAudio.HOST, int(port or NetAudio.PORT),
+                                    protocol.lower() or "udp")
+
+    def on_pipeline_error(self, error):
+        """Remember DSP thread errors so the Tk thread can report them"""
+        self.pipeline_error = error
+
+    def pipeline_status(self):
+        """Show ring buffer fill levels and dropouts while buffered DSP runs"""
+        if not self.pipeline:
+            self.status_label.configure(text="")
+            return
+        stats = self.pipeline.stats()
+        status = (f"in {stats['input_fill']:.0%}  out {stats['output_fill']:.0%}  "
+                  f"underruns {stats['underruns']}")
+        if 'restarts' in stats:
+            status += f"  restarts {stats['restarts']}"
+        self.status_label.configure(text=status)
+        if self.pipeline_error is not None:
+            self.logger.log_error(f"[ERR] Error in audio processing: {self.pipeline_error}")
+            self.pipeline_error = None
+        self.after(500, self.pipeline_status)
+
+    def get_device_name(self, device_string):
+        return device_string.split(":", 1)[1].strip() if device_string else "default"
+
+    def load_noise_profile(self):
+        """Restore the input device's noise profile into the effect chain"""
+        device_name = self.get_device_name(self.input_devices.get())
+        if self.chain.noise_reducer.load_profile(device_name):
+            self.logger.log_info(f"[INFO] Loaded noise profile for {device_name}")
+        else:
+            self.logger.log_info("[INFO] Learning noise profile, stay quiet for a second")
+
+    def save_noise_profile(self):
+        """Persist the learned noise profile for the current input device"""
+        device_name = self.get_device_name(self.input_devices.get())
+        try:
+            if self.chain.noise_reducer.save_profile(device_name):
+                self.logger.log_info(f"[INFO] Saved noise profile for {device_name}")
+        except Exception as e:
+            self.logger.log_error(f"[ERR] Error saving noise profile: {e}")
+
     def upload_audio_enable(self):
         if self.radio_var.get() == 2:
             self.upload_audio_button.configure(state="normal")
             self.generate_button.configure(state="normal")
+            self.preview_switch.configure(state="normal")
             # Stop the stream if running
             if self.is_running:
                 self.start()  # This will stop the stream since self.is_running is True
             self.logger.log_info("[INFO] Mode: Pre-Record")
         else:
             self.logger.log_info("[INFO] Mode: Realtime")
+            if self.preview_var.get():
+                self.preview_var.set(False)
+                self.toggle_preview()
+            self.preview_switch.configure(state="disabled")
             self.upload_audio_button.configure(state="disabled")
             self.generate_button.configure(state="disabled")
             self.media_button.configure(state="disabled")
@@ -350,70 +673,112 @@ class App(ctk.CTk):
 
     def media_con(self):
         """Control playback of the modified audio"""
-        if self.modified_audio is None or len(self.modified_audio) == 0:
+        if self.player is None or self.player.rendered == 0:
             self.logger.log_warning("[WARN] No modified audio available to play")
             return
             
         if self.is_playing:
             # Stop playback
             try:
-                sd.stop()
+                self.player.stop()
                 self.is_playing = False
                 self.media_button.configure(text="⏯")
                 self.logger.log_info("[INFO] Playback stopped")
             except Exception as e:
                 self.logger.log_error(f"[ERR] Error stopping playback: {e}")
         else:
-            # Start playback
+            # Start playback, even while the rest is still rendering
             try:
-                sd.play(self.modified_audio, RealTime.RATE)
+                if self.preview_var.get():
+                    self.preview_var.set(False)
+                    self.toggle_preview()
+                self.player.play()
                 self.is_playing = True
                 self.media_button.configure(text="⏹")
                 self.logger.log_info("[INFO] Playing modified audio")
                 
-                # Update progress bar (basic implementation)
+                # Follow the playback position
                 self.after(100, self.media_progress)
             except Exception as e:
                 self.logger.log_error(f"[ERR] Error playing audio: {e}")
 
     def generate_media(self):
-        """Process the uploaded audio file with the selected effects"""
+        """Render the uploaded audio file with the selected effects in the background"""
         if not self.filename:
             self.logger.log_warning("[WARN] No audio file selected")
             return
+        if self.render_thread is not None and self.render_thread.is_alive():
+            self.logger.log_warning("[WARN] Still generating, please wait")
+            return
             
         self.logger.log_info("[***] Generating Modified Audio...")
         
+        # Stop playing the previous result
+        if self.is_playing:
+            self.media_con()
+        self.player = None
+        self.modified_audio = None
+        self.render_error = None
+        self.media_button.configure(state="disabled")
+        self.save_audio.configure(state="disabled")
+        self.media_progress_bar.set(0)
+
+        self.render_thread = threading.Thread(
+            target=self.render_media,
+            args=(self.filename, self.read_params()),
+            daemon=True
+        )
+        self.render_thread.start()
+        self.after(100, self.render_progress)
+
+    def render_media(self, filename, params):
+        """Render thread: feed the player chunk by chunk"""
         try:
-            # Get current settings
-            pitch_shift_value = self.pitch.get()
-            volume = self.volume.get() / 100.0
-            echo_value = self.echo.get() / 100.0
-            reverb_value = self.reverb.get() / 100.0
-            gate_threshold = self.gate_scale.get() / 100.0
-            use_low_cut = self.low_cut_var.get()
-            use_high_cut = self.high_cut_var.get()
-            
-            # Process the audio using PreRec module
-            self.modified_audio = PreRec.process_audio(
-                self.filename,
-                pitch_shift=pitch_shift_value,
-                volume=volume,
-                echo=echo_value,
-                reverb=reverb_value,
-                gate_threshold=gate_threshold,
-                low_cut=use_low_cut,
-                high_cut=use_high_cut
+            audio_data = PreRec.prepare_audio(
+                filename,
+                gate_threshold=params['gate_threshold'],
+                noise_reduction=params['noise_reduction']
             )
-            
-            # Enable media controls
+            player = Playback.StreamingPlayer(len(audio_data), RealTime.as_channels(audio_data).shape[1])
+            self.player = player
+
+            # Keep the render workers between runs: spawning them takes seconds
+            if self.render_pool is None:
+                self.render_pool = PreRec.render_pool()
+
+            for chunk in PreRec.render_chunks(
+                audio_data,
+                pitch_shift=params['pitch'],
+                volume=params['volume'],
+                echo=params['echo'],
+                reverb=params['reverb'],
+                low_cut=params['low_cut'],
+                high_cut=params['high_cut'],
+                workers=os.cpu_count() or 1,
+                tone={key: params[key] for key in RealTime.TONE_PARAMS},
+                pool=self.render_pool
+            ):
+                player.feed(chunk)
+            player.finish()
+        except Exception as e:
+            self.render_error = e
+
+    def render_progress(self):
+        """Enable the controls as soon as the first chunk is ready"""
+        if self.render_error is not None:
+            self.logger.log_error(f"[ERR] Error processing audio: {self.render_error}")
+            self.render_error = None
+            return
+
+        if self.player is not None and self.player.rendered > 0:
             self.media_button.configure(state="normal")
+
+        if self.render_thread.is_alive():
+            self.after(100, self.render_progress)
+        elif self.player is not None and self.player.finished:
+            self.modified_audio = self.player.audio
             self.save_audio.configure(state="normal")
-            
             self.logger.log_info("[INFO] Audio processing complete")
-            
-        except Exception as e:
-            self.logger.log_error(f"[ERR] Error processing audio: {e}")
 
     def save_file(self):
         """Save the modified audio to a file"""
@@ -422,14 +787,21 @@ class App(ctk.CTk):
             return
             
         try:
+            save_type = tk.StringVar(value=SAVE_TYPES[0][0])
             self.file_loc = filedialog.asksaveasfilename(
                 defaultextension=".wav",
-                filetypes=[("WAV files", "*.wav")]
+                filetypes=[(label, pattern) for label, pattern, _ in SAVE_TYPES],
+                typevariable=save_type
             )
             
             if self.file_loc:
+                # The WAV entries pick the sample format, other formats use their default
+                subtype = None
+                if self.file_loc.lower().endswith(".wav"):
+                    subtype = next((st for label, _, st in SAVE_TYPES if label == save_type.get()), None)
+
                 # Use PreRec module to save the audio
-                PreRec.save_audio(self.modified_audio, self.file_loc)
+                PreRec.save_audio(self.modified_audio, self.file_loc, subtype=subtype)
                 self.logger.log_info(f"[SAVE] Saving File to: {self.file_loc}")
             else:
                 self.logger.log_warning("[WARN] Save operation canceled")
@@ -439,29 +811,74 @@ class App(ctk.CTk):
 
     def media_progress(self):
         """Update the media progress bar during playback"""
-        if self.is_playing and self.modified_audio is not None:
+        if self.is_playing and self.player is not None:
             try:
-                # Get current playback position
-                try:
-                    current_frame = sd.get_stream().active
-                    total_frames = len(self.modified_audio)
-                    progress = current_frame / total_frames if total_frames > 0 else 0
-                    self.media_progress_bar.set(progress)
-                except:
-                    # Fallback if we can't get the exact position
-                    # This is a simple animation to show something is happening
-                    current = self.media_progress_bar.get()
-                    if current < 1:
-                        self.media_progress_bar.set(current + 0.01)
-                    else:
-                        self.media_progress_bar.set(0)
+                # Exact position from the frames the output stream consumed
+                self.media_progress_bar.set(self.player.progress())
+
+                # Playback ran to the end of the file
+                if not self.player.active:
+                    self.player.stop()
+                    self.is_playing = False
+                    self.media_button.configure(text="⏯")
+                    return
                 
                 # Schedule next update
-                if self.is_playing:
-                    self.after(100, self.media_progress)
+                self.after(100, self.media_progress)
             except Exception as e:
                 self.logger.log_error(f"[ERR] Error updating progress: {e}")
+
+    def seek_media(self, event):
+        """Jump to the clicked position of the progress bar"""
+        target = self.preview or self.player
+        if target is None:
+            return
+        width = self.media_progress_bar.winfo_width()
+        if width > 0:
+            target.seek(event.x / width)
+            self.media_progress_bar.set(target.progress())
+
+    def toggle_preview(self):
+        """Start or stop looping the playhead region through the live effect chain"""
+        if not self.preview_var.get():
+            if self.preview:
+                self.preview.stop()
+                self.preview = None
+                self.logger.log_info("[INFO] Live preview stopped")
+            return
+
+        if not self.filename:
+            self.logger.log_warning("[WARN] No audio file selected")
+            self.preview_var.set(False)
+            return
+
+        try:
+            # The rendered file and the preview would talk over each other
+            if self.is_playing:
+                self.media_con()
+            source = PreRec.load_audio(self.filename)
+            self.preview = Playback.PreviewPlayer(source, lambda: self.params)
+            self.preview.start(self.media_progress_bar.get())
+            self.logger.log_info("[INFO] Live preview: move the sliders to hear the changes")
+            self.after(100, self.preview_progress)
+        except Exception as e:
+            self.logger.log_error(f"[ERR] Error starting preview: {e}")
+            self.preview_var.set(False)
+            self.preview = None
+
+    def preview_progress(self):
+        """Follow the preview playhead on the progress bar"""
+        if self.preview is not None:
+            self.media_progress_bar.set(self.preview.progress())
+            self.after(100, self.preview_progress)
                 
+    def warm_decode_cache(self, filename):
+        """Background thread: decode and resample the selected file once"""
+        try:
+            PreRec.load_audio(filename)
+        except Exception as e:
+            self.render_error = e
+
     def upload_audio_file(self):
         self.filename = filedialog.askopenfilename(
             initialdir=os.getcwd(),
@@ -471,10 +888,14 @@ class App(ctk.CTk):
         if self.filename:
             self.logger.log_info(f"[INFO] Selected file: {self.filename}")
             self.generate_button.configure(state="normal")
+            # Decode into the cache now so GENERATE and preview start right away
+            threading.Thread(target=self.warm_decode_cache, args=(self.filename,), daemon=True).start()
         else:
             self.logger.log_warning("[WARN] No File Selected")
             self.generate_button.configure(state="disabled")
 
 if __name__ == "__main__":
     app = App()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    if app.render_pool is not None:
+        app.render_pool.shutdown(cancel_futures=True)
\ No newline at end of file